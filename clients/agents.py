@@ -0,0 +1,108 @@
+import os
+import json
+import dataclasses
+from dataclasses import dataclass
+from typing import Optional, Any, Dict
+
+from clients.routing import RoutingPolicy
+
+SYSTEM_PROMPT_FILE = "system_prompt.md"
+SERVER_CONFIG_FILE = "server_config.json"
+
+DEFAULT_MODEL = "claude-3-7-sonnet-20250219"
+
+
+@dataclass
+class AgentSpec:
+    """Definition of an agent: a system prompt plus the MCP servers it uses."""
+
+    name: str
+    system_prompt_path: str
+    server_config_path: str
+    output_dir: str
+    model: str = DEFAULT_MODEL
+    max_tokens: int = 4096
+    max_iterations: int = 10
+    # Maximum number of tasks of this agent running at the same time
+    max_concurrency: int = 1
+    # Warm likely next file reads while the model is generating
+    prefetch: bool = False
+    # Faster model for simple turns (e.g. acknowledging a tool result), see clients.routing
+    fast_model: Optional[str] = None
+    # RoutingPolicy thresholds replacing the defaults, e.g. {"max_context_bytes": 32768}
+    routing: Optional[Dict[str, Any]] = None
+    # Run each task in a private overlay of output_dir, committed only if it succeeds
+    isolate: bool = False
+    # Directory cloned (copy-on-write where supported) into each overlay
+    template_dir: Optional[str] = None
+
+    @classmethod
+    def from_dir(cls, agent_dir: str, **overrides: Any) -> "AgentSpec":
+        """Build a spec from an `agents/<name>` directory.
+
+        Args:
+            agent_dir: Directory holding system_prompt.md and server_config.json.
+            overrides: Optional field values replacing the defaults.
+        """
+        agent_dir = os.path.normpath(agent_dir)
+        fields: Dict[str, Any] = {
+            "name": os.path.basename(agent_dir),
+            "system_prompt_path": os.path.join(agent_dir, SYSTEM_PROMPT_FILE),
+            "server_config_path": os.path.join(agent_dir, SERVER_CONFIG_FILE),
+            "output_dir": os.path.join(agent_dir, "output"),
+        }
+        fields.update(overrides)
+        return cls(**fields)
+
+    def routing_policy(self) -> RoutingPolicy:
+        """Build the routing policy of the agent from `fast_model` and `routing`.
+
+        Raises:
+            ValueError: If `routing` has a key that is not a RoutingPolicy field.
+        """
+        options = dict(self.routing or {})
+        known = {field.name for field in dataclasses.fields(RoutingPolicy)}
+        unknown = sorted(set(options) - known)
+        if unknown:
+            raise ValueError(
+                f"Unknown routing options for agent {self.name}: {', '.join(unknown)}"
+            )
+        if self.fast_model:
+            options["fast_model"] = self.fast_model
+        return RoutingPolicy(**options)
+
+    def load_server_config(self) -> Dict[str, Any]:
+        """Load the `mcpServers` section of the agent's server config."""
+        with open(self.server_config_path, "r") as f:
+            return json.load(f)["mcpServers"]
+
+
+def is_agent_dir(path: str) -> bool:
+    """Return True if the directory contains an agent definition."""
+    return os.path.isfile(os.path.join(path, SYSTEM_PROMPT_FILE)) and os.path.isfile(
+        os.path.join(path, SERVER_CONFIG_FILE)
+    )
+
+
+def discover_agents(
+    agents_root: str = "agents", overrides: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, AgentSpec]:
+    """Find every agent definition directly under `agents_root`.
+
+    Args:
+        agents_root: Directory to scan.
+        overrides: Optional per-agent field overrides, keyed by agent name.
+
+    Returns:
+        Agent specs keyed by agent name, sorted by name.
+    """
+    overrides = overrides or {}
+    agents: Dict[str, AgentSpec] = {}
+    if not os.path.isdir(agents_root):
+        return agents
+    for entry in sorted(os.scandir(agents_root), key=lambda e: e.name):
+        if entry.is_dir() and is_agent_dir(entry.path):
+            agents[entry.name] = AgentSpec.from_dir(
+                entry.path, **overrides.get(entry.name, {})
+            )
+    return agents
@@ -0,0 +1,399 @@
+"""Command line entry point for running agents.
+
+Only the standard library and `clients.agents` are imported at module load so that
+`list` and `validate` stay near-instant. The Anthropic SDK, MCP and dotenv are
+imported lazily by the commands that need them.
+
+Usage:
+    python -m clients.cli list
+    python -m clients.cli validate [agent ...]
+    python -m clients.cli run <agent> [--query "..."]
+    python -m clients.cli serve [--port 8000]
+    python -m clients.cli loadtest <scenario.json> [--baseline baseline.json]
+"""
+
+import time
+
+_START = time.perf_counter()
+
+import os
+import sys
+import shutil
+import argparse
+import importlib
+from typing import Any, Dict, List, Optional
+
+from clients.agents import AgentSpec, discover_agents, is_agent_dir
+
+
+class Timer:
+    """Records how long startup steps and lazy imports take."""
+
+    def __init__(self) -> None:
+        self.steps: List[tuple] = []
+        self.last = _START
+        self.mark("cli module")
+
+    def mark(self, name: str) -> None:
+        """Record the time spent since the previous mark under `name`."""
+        now = time.perf_counter()
+        self.steps.append((name, now - self.last))
+        self.last = now
+
+    def lazy_import(self, module_name: str) -> Any:
+        """Import a module on first use and record the import time."""
+        self.last = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self.mark(f"import {module_name}")
+        return module
+
+    def report(self) -> None:
+        """Print the recorded steps and the total time since the CLI started."""
+        for name, seconds in self.steps:
+            print(f"  {name:<32} {seconds * 1000:8.1f} ms", file=sys.stderr)
+        total = time.perf_counter() - _START
+        print(f"  {'total':<32} {total * 1000:8.1f} ms", file=sys.stderr)
+
+
+def load_agent(agents_root: str, name: str, overrides: Dict[str, Any]) -> AgentSpec:
+    """Load a single agent definition, exiting with an error if it does not exist."""
+    agent_dir = os.path.join(agents_root, name)
+    if not is_agent_dir(agent_dir):
+        sys.exit(f"Agent {name} not found under {agents_root}")
+    return AgentSpec.from_dir(agent_dir, **overrides)
+
+
+def validate_agent(spec: AgentSpec) -> List[str]:
+    """Statically check an agent definition without starting its servers.
+
+    Returns:
+        A list of problems, empty if the agent looks runnable.
+    """
+    import json
+
+    try:
+        config = spec.load_server_config()
+    except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+        return [f"invalid {os.path.basename(spec.server_config_path)}: {e!r}"]
+
+    problems = []
+    if not isinstance(config, dict) or not config:
+        return ["mcpServers must be a non-empty object"]
+    for name, server_config in config.items():
+        if not isinstance(server_config, dict):
+            problems.append(f"server {name}: must be an object")
+            continue
+        command = server_config.get("command")
+        if not command:
+            problems.append(f"server {name}: missing command")
+        elif not isinstance(command, str):
+            problems.append(f"server {name}: command must be a string")
+        elif shutil.which(command) is None:
+            problems.append(f"server {name}: command not found: {command}")
+        env = server_config.get("env")
+        if env is not None and (
+            not isinstance(env, dict)
+            or not all(isinstance(value, str) for value in env.values())
+        ):
+            problems.append(f"server {name}: env must be an object of strings")
+        args = server_config.get("args", [])
+        if not isinstance(args, list):
+            problems.append(f"server {name}: args must be a list")
+            continue
+        for arg in args:
+            if not isinstance(arg, str):
+                problems.append(f"server {name}: args must be strings, got {arg!r}")
+            elif arg.endswith(".py") and not os.path.isfile(arg):
+                problems.append(f"server {name}: script not found: {arg}")
+    return problems
+
+
+def cmd_list(args: argparse.Namespace, timer: Timer) -> int:
+    for name, spec in discover_agents(args.agents_root).items():
+        print(f"{name}\t{spec.output_dir}")
+    return 0
+
+
+def cmd_validate(args: argparse.Namespace, timer: Timer) -> int:
+    agents = discover_agents(args.agents_root)
+    names = args.agents or list(agents)
+    failed = 0
+    for name in names:
+        if name not in agents:
+            print(f"{name}: not found under {args.agents_root}")
+            failed += 1
+            continue
+        problems = validate_agent(agents[name])
+        if problems:
+            failed += 1
+            for problem in problems:
+                print(f"{name}: {problem}")
+        else:
+            print(f"{name}: ok")
+    return 1 if failed else 0
+
+
+def cmd_run(args: argparse.Namespace, timer: Timer) -> int:
+    overrides: Dict[str, Any] = {
+        "max_iterations": args.max_iterations,
+        "prefetch": args.prefetch,
+    }
+    for field in ("model", "fast_model", "routing", "max_tokens", "output_dir"):
+        if getattr(args, field) is not None:
+            overrides[field] = getattr(args, field)
+    spec = load_agent(args.agents_root, args.agent, overrides)
+    try:
+        routing_policy = spec.routing_policy()
+    except ValueError as e:
+        sys.exit(str(e))
+
+    asyncio = timer.lazy_import("asyncio")
+    timer.lazy_import("dotenv").load_dotenv()
+    client_module = timer.lazy_import("clients.main")
+
+    if args.query is None:
+        if args.timing:
+            timer.report()
+        asyncio.run(
+            client_module.run_client(
+                server_config_path=spec.server_config_path,
+                output_dir=spec.output_dir,
+                model=spec.model,
+                max_tokens=spec.max_tokens,
+                max_iterations=spec.max_iterations,
+                system_prompt_path=spec.system_prompt_path,
+                prefetch=spec.prefetch,
+                routing_policy=routing_policy,
+            )
+        )
+        return 0
+
+    async def run_once() -> str:
+        client = client_module.MCPClient(
+            output_dir=spec.output_dir,
+            model=spec.model,
+            max_tokens=spec.max_tokens,
+            max_iterations=spec.max_iterations,
+            system_prompt_path=spec.system_prompt_path,
+            prefetch=spec.prefetch,
+            router=client_module.Router(spec.model, routing_policy),
+        )
+        try:
+            timer.last = time.perf_counter()
+            await client.initialize_servers(spec.server_config_path)
+            timer.mark("server startup")
+            messages = await client.loop(args.query)
+            timer.mark("agent loop")
+            return client_module.final_text(messages)
+        finally:
+            await client.cleanup()
+
+    print(asyncio.run(run_once()))
+    if args.timing:
+        timer.report()
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace, timer: Timer) -> int:
+    overrides = {
+        name: {
+            "max_concurrency": args.agent_concurrency,
+            "prefetch": args.prefetch,
+            "fast_model": args.fast_model,
+            "routing": args.routing,
+        }
+        for name in discover_agents(args.agents_root)
+    }
+    timer.lazy_import("dotenv").load_dotenv()
+    uvicorn = timer.lazy_import("uvicorn")
+    orchestrator_module = timer.lazy_import("clients.orchestrator")
+    service_module = timer.lazy_import("clients.service")
+
+    anthropic = None
+    if args.fake_model:
+        anthropic = timer.lazy_import("clients.fake_model").FakeAnthropic()
+    try:
+        orchestrator = orchestrator_module.Orchestrator.from_agents_dir(
+            args.agents_root, overrides, anthropic=anthropic
+        )
+    except ValueError as e:
+        # Invalid routing options
+        sys.exit(str(e))
+    service = service_module.AgentService(
+        orchestrator, workers=args.workers, max_queue=args.max_queue
+    )
+    if args.timing:
+        timer.report()
+    uvicorn.run(service_module.create_app(service), host=args.host, port=args.port)
+    return 0
+
+
+def cmd_loadtest(args: argparse.Namespace, timer: Timer) -> int:
+    import json
+
+    asyncio = timer.lazy_import("asyncio")
+    loadtest = timer.lazy_import("clients.loadtest")
+    scenario = loadtest.load_scenario(args.scenario)
+    if args.duration is not None and args.requests is None:
+        # A duration alone runs for the whole duration, whatever the scenario's count
+        scenario.pop("requests", None)
+    for field in ("concurrency", "requests", "duration"):
+        if getattr(args, field) is not None:
+            scenario[field] = getattr(args, field)
+
+    report = asyncio.run(loadtest.LoadTest(scenario, args.agents_root).run())
+    print(loadtest.format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            rows = loadtest.compare(report, json.load(f), args.tolerance)
+        print(loadtest.format_comparison(rows))
+        regressions = sum(1 for row in rows if row["regression"])
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+
+ROUTING_HELP = (
+    "RoutingPolicy thresholds as a JSON object, "
+    'e.g. \'{"max_context_bytes": 32768, "escalation_turns": 3}\'.'
+)
+
+
+def json_object(value: str) -> Dict[str, Any]:
+    """Argparse type for options taking a JSON object."""
+    import json
+
+    try:
+        parsed = json.loads(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid JSON: {e}")
+    if not isinstance(parsed, dict):
+        raise argparse.ArgumentTypeError("expected a JSON object")
+    return parsed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pyagents", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument(
+        "--agents-root", default="agents", help="Directory holding agent definitions."
+    )
+    parser.add_argument(
+        "--timing", action="store_true", help="Report import and startup timing."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List discovered agents.")
+    list_parser.set_defaults(func=cmd_list)
+
+    validate_parser = subparsers.add_parser(
+        "validate", help="Check agent configs without starting servers."
+    )
+    validate_parser.add_argument(
+        "agents", nargs="*", help="Agents to check (default: all)."
+    )
+    validate_parser.set_defaults(func=cmd_validate)
+
+    run_parser = subparsers.add_parser("run", help="Run an agent.")
+    run_parser.add_argument("agent", help="Name of the agent directory.")
+    run_parser.add_argument(
+        "-q", "--query", help="Run a single query and exit instead of chatting."
+    )
+    run_parser.add_argument("--model", help="Override the agent model.")
+    run_parser.add_argument(
+        "--fast-model", help="Faster model for simple turns (default: no routing)."
+    )
+    run_parser.add_argument("--routing", type=json_object, help=ROUTING_HELP)
+    run_parser.add_argument("--max-tokens", type=int, help="Override max tokens.")
+    run_parser.add_argument("--max-iterations", type=int, default=10)
+    run_parser.add_argument("--output-dir", help="Override the agent output directory.")
+    run_parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Warm likely next file reads while the model is generating.",
+    )
+    run_parser.set_defaults(func=cmd_run)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve the agents over HTTP and WebSocket."
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument(
+        "--workers", type=int, default=4, help="Jobs running at the same time."
+    )
+    serve_parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=64,
+        help="Queued jobs before new ones are rejected with 429.",
+    )
+    serve_parser.add_argument(
+        "--agent-concurrency",
+        type=int,
+        default=4,
+        help="Jobs of the same agent running at the same time.",
+    )
+    serve_parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Warm likely next file reads while the model is generating.",
+    )
+    serve_parser.add_argument(
+        "--fast-model", help="Faster model for simple turns (default: no routing)."
+    )
+    serve_parser.add_argument("--routing", type=json_object, help=ROUTING_HELP)
+    serve_parser.add_argument(
+        "--fake-model",
+        action="store_true",
+        help="Answer with a local echo model instead of the Anthropic API.",
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+
+    loadtest_parser = subparsers.add_parser(
+        "loadtest", help="Drive an MCP server with concurrent tool calls."
+    )
+    loadtest_parser.add_argument("scenario", help="Scenario JSON file.")
+    loadtest_parser.add_argument("--concurrency", type=int, help="Calls in flight.")
+    loadtest_parser.add_argument("--requests", type=int, help="Total calls to send.")
+    loadtest_parser.add_argument(
+        "--duration",
+        type=float,
+        help="Stop after this many seconds, unlimited calls unless --requests is given.",
+    )
+    loadtest_parser.add_argument("--output", help="Write the report as JSON.")
+    loadtest_parser.add_argument(
+        "--baseline", help="Compare with a saved report, exit 1 on regressions."
+    )
+    loadtest_parser.add_argument(
+        "--save-baseline", help="Save the report as the new baseline."
+    )
+    loadtest_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative change allowed before a metric regresses.",
+    )
+    loadtest_parser.set_defaults(func=cmd_loadtest)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    timer = Timer()
+    args = build_parser().parse_args(argv)
+    timer.mark("parse arguments")
+    code = args.func(args, timer)
+    if args.timing and args.command not in ("run", "serve"):
+        timer.report()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from anthropic.types import TextBlock
+
+
+class FakeMessages:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    async def create(self, messages: List[Dict[str, Any]], **kwargs: Any) -> Any:
+        await asyncio.sleep(self.delay)
+        query = messages[-1]["content"]
+        return SimpleNamespace(
+            content=[TextBlock(type="text", text=f"echo: {query}")],
+            stop_reason="end_turn",
+        )
+
+
+class FakeAnthropic:
+    """Stand-in for AsyncAnthropic answering every query with an echo, without tools.
+
+    Useful to exercise the client, orchestrator and service locally without an API key.
+    """
+
+    def __init__(self, delay: float = 0.5) -> None:
+        self.messages = FakeMessages(delay)
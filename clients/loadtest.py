@@ -0,0 +1,447 @@
+"""Load generator for MCP servers under concurrent tool traffic.
+
+A scenario (JSON) names the server to start over stdio and the mix of tool calls
+to send it:
+
+    {
+        "name": "utils",
+        "server": {"agent": "hello_world", "name": "utils"},
+        "concurrency": 16,
+        "requests": 400,
+        "payload_sizes": [1024, 65536],
+        "files": {"app.py": "import modal\\napp = modal.App('load')\\n"},
+        "stubs": {"clis": {"modal": {"delay": 0.05}}, "http": {"delay": 0.01}},
+        "calls": [
+            {"tool": "read_file", "weight": 4, "args": {"file_path": "{workdir}/seed_{size}.txt"}},
+            {"tool": "write_file", "weight": 1, "args": {"file_path": "{workdir}/out/{n}.txt", "content": "{payload}"}},
+            {"tool": "make_request", "weight": 1, "args": {"url": "{http_url}/ping"}}
+        ]
+    }
+
+"server" is either an inline server config ({"command", "args", "env"}) or a
+server of an agent's server_config.json. Calls are picked at random by weight and
+each gets a payload size from "payload_sizes". Extra server environment variables
+go in "env". The run stops after "requests" calls or "duration" seconds, whichever
+comes first: with only a duration it lasts the whole duration, with neither it
+sends 200 calls. Placeholders in string args and env values: {workdir} (a scratch
+directory holding seed_<size>.txt files and "files"), {n} (call number), {size},
+{payload} (a string of that size) and {http_url}.
+
+Everything runs offline: "stubs.clis" puts fake executables first on the server's
+PATH (they sleep, then print their argv as JSON) and "stubs.http" serves JSON on a
+local port.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Any, Dict, Iterator, List, Tuple
+
+from mcp.client.stdio import get_default_environment
+
+from clients.agents import AgentSpec
+from clients.main import Server
+from clients.routing import tool_failed
+
+# Baseline comparison: relative change tolerated before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+# Absolute increase of the error rate tolerated
+ERROR_RATE_TOLERANCE = 0.01
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        scenario = json.load(f)
+    scenario.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return scenario
+
+
+def resolve_server_config(server: Dict[str, Any], agents_root: str) -> Dict[str, Any]:
+    """Return the {"command", "args", "env"} config of the scenario's server."""
+    if "agent" not in server:
+        return server
+    spec = AgentSpec.from_dir(os.path.join(agents_root, server["agent"]))
+    return spec.load_server_config()[server["name"]]
+
+
+def substitute(value: Any, values: Dict[str, str]) -> Any:
+    """Replace {placeholders} in the strings of a JSON value."""
+    if isinstance(value, str):
+        for key, replacement in values.items():
+            value = value.replace("{" + key + "}", replacement)
+        return value
+    if isinstance(value, dict):
+        return {key: substitute(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, values) for item in value]
+    return value
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "p99": percentile(values, 0.99),
+        "max": values[-1] if values else None,
+    }
+
+
+STUB_CLI = """#!{python}
+import sys, time, json
+time.sleep({delay})
+print(json.dumps({{"argv": sys.argv[1:]}}))
+"""
+
+
+def write_stub_clis(bin_dir: str, clis: Dict[str, Dict[str, Any]]) -> None:
+    """Create fake executables answering every command after a delay."""
+    os.makedirs(bin_dir, exist_ok=True)
+    for name, options in clis.items():
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(
+                STUB_CLI.format(python=sys.executable, delay=options.get("delay", 0))
+            )
+        os.chmod(path, 0o755)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def respond(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.delay)
+        body = json.dumps(
+            {"method": self.command, "path": self.path, "received": length}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = respond
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_http_stand_in(delay: float = 0) -> ThreadingHTTPServer:
+    """Serve JSON echoes on a free local port, in a background thread."""
+    handler = type("Handler", (StandInHandler,), {"delay": delay})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def child_pids() -> List[int]:
+    """Direct children of this process (Linux only, empty elsewhere)."""
+    pids = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return pids
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name is parenthesized and may contain spaces
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == os.getpid():
+            pids.append(int(entry))
+    return pids
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """Current (VmRSS) and peak (VmHWM) resident memory of a process."""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    memory["rss_mb" if key == "VmRSS" else "peak_rss_mb"] = (
+                        int(value.split()[0]) / 1024
+                    )
+    except OSError:
+        pass
+    return memory
+
+
+class LoadTest:
+    """Runs one scenario against a freshly started server."""
+
+    def __init__(self, scenario: Dict[str, Any], agents_root: str = "agents") -> None:
+        self.scenario = scenario
+        self.agents_root = agents_root
+        self.concurrency: int = scenario.get("concurrency", 8)
+        self.duration: Optional[float] = scenario.get("duration")
+        # Unlimited (None) when only a duration is given
+        self.requests: Optional[int] = scenario.get(
+            "requests", None if self.duration else 200
+        )
+        self.timeout: float = scenario.get("timeout", 60)
+        self.payload_sizes: List[int] = scenario.get("payload_sizes", [1024])
+        self.calls: List[Dict[str, Any]] = scenario["calls"]
+        self.random = random.Random(scenario.get("seed", 0))
+        self.payloads = {size: "x" * size for size in self.payload_sizes}
+        # (tool, seconds, error) of every finished call
+        self.results: List[Tuple[str, float, Optional[str]]] = []
+        self.in_flight = 0
+
+    def prepare(self, workdir: str, http_url: str) -> Dict[str, Any]:
+        """Create the seed files and stubs, and return the server config to start."""
+        for size, payload in self.payloads.items():
+            with open(os.path.join(workdir, f"seed_{size}.txt"), "w") as f:
+                f.write(payload)
+        for relative, content in self.scenario.get("files", {}).items():
+            path = os.path.join(workdir, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+        values = {"workdir": workdir, "http_url": http_url}
+        config = resolve_server_config(self.scenario["server"], self.agents_root)
+        env = {
+            **get_default_environment(),
+            **substitute(config.get("env") or {}, values),
+            **substitute(self.scenario.get("env", {}), values),
+        }
+        clis = self.scenario.get("stubs", {}).get("clis")
+        if clis:
+            bin_dir = os.path.join(workdir, "bin")
+            write_stub_clis(bin_dir, clis)
+            env["PATH"] = bin_dir + os.pathsep + env.get("PATH", os.defpath)
+        return {
+            "command": config["command"],
+            "args": config.get("args", []),
+            "env": env,
+        }
+
+    def plan(self, workdir: str, http_url: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Endless stream of (tool, args) picked by weight."""
+        weights = [call.get("weight", 1) for call in self.calls]
+        n = 0
+        while True:
+            call = self.random.choices(self.calls, weights)[0]
+            size = self.random.choice(self.payload_sizes)
+            values = {
+                "workdir": workdir,
+                "http_url": http_url,
+                "n": str(n),
+                "size": str(size),
+                "payload": self.payloads[size],
+            }
+            yield call["tool"], substitute(call.get("args", {}), values)
+            n += 1
+
+    async def call(self, server: Server, tool: str, args: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        error = None
+        try:
+            result = await asyncio.wait_for(
+                server.session.call_tool(tool, args), self.timeout
+            )
+            if result.isError or tool_failed(result.content):
+                text = " ".join(getattr(block, "text", "") for block in result.content)
+                error = " ".join(text.split())[:200]
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as e:
+            error = repr(e)
+        self.results.append((tool, time.perf_counter() - start, error))
+
+    async def worker(
+        self,
+        server: Server,
+        plan: Iterator[Tuple[str, Dict[str, Any]]],
+        deadline: float,
+    ) -> None:
+        while (
+            self.requests is None or len(self.results) + self.in_flight < self.requests
+        ):
+            if time.perf_counter() > deadline:
+                return
+            tool, args = next(plan)
+            self.in_flight += 1
+            try:
+                await self.call(server, tool, args)
+            finally:
+                self.in_flight -= 1
+
+    async def run(self) -> Dict[str, Any]:
+        http = self.scenario.get("stubs", {}).get("http")
+        httpd = start_http_stand_in(http.get("delay", 0)) if http is not None else None
+        http_url = f"http://127.0.0.1:{httpd.server_port}" if httpd else ""
+        try:
+            with tempfile.TemporaryDirectory(prefix="pyagents-load-") as workdir:
+                config = self.prepare(workdir, http_url)
+                return await self.drive(config, workdir, http_url)
+        finally:
+            if httpd:
+                httpd.shutdown()
+
+    async def drive(
+        self, config: Dict[str, Any], workdir: str, http_url: str
+    ) -> Dict[str, Any]:
+        known = set(child_pids())
+        server = Server(self.scenario["name"], config)
+        await server.initialize()
+        try:
+            pids = [pid for pid in child_pids() if pid not in known]
+            memory_before = memory_mb(pids[0]) if pids else {}
+            plan = self.plan(workdir, http_url)
+            self.results = []
+            self.in_flight = 0
+            deadline = time.perf_counter() + (self.duration or float("inf"))
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(self.worker(server, plan, deadline) for _ in range(self.concurrency))
+            )
+            elapsed = time.perf_counter() - start
+            memory_after = memory_mb(pids[0]) if pids else {}
+        finally:
+            await server.cleanup()
+        return self.report(elapsed, memory_before, memory_after)
+
+    def report(
+        self,
+        elapsed: float,
+        memory_before: Dict[str, float],
+        memory_after: Dict[str, float],
+    ) -> Dict[str, Any]:
+        errors = [result for result in self.results if result[2] is not None]
+        tools: Dict[str, Dict[str, Any]] = {}
+        for tool in sorted({result[0] for result in self.results}):
+            results = [result for result in self.results if result[0] == tool]
+            tools[tool] = {
+                "calls": len(results),
+                "errors": sum(1 for result in results if result[2] is not None),
+                "latency_ms": latency_summary([result[1] for result in results]),
+            }
+        calls = len(self.results)
+        return {
+            "scenario": self.scenario["name"],
+            "concurrency": self.concurrency,
+            "calls": calls,
+            "errors": len(errors),
+            "error_rate": len(errors) / calls if calls else 0.0,
+            "duration_seconds": elapsed,
+            "throughput": calls / elapsed if elapsed else 0.0,
+            "latency_ms": latency_summary([result[1] for result in self.results]),
+            "tools": tools,
+            "memory": {
+                "rss_start_mb": memory_before.get("rss_mb"),
+                "rss_end_mb": memory_after.get("rss_mb"),
+                "peak_rss_mb": memory_after.get("peak_rss_mb"),
+            },
+            "error_samples": sorted({result[2] for result in errors})[:5],
+        }
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[Dict[str, Any]]:
+    """Compare a report with a baseline report of the same scenario.
+
+    Returns:
+        One entry per metric with both values, the relative change and whether it
+        is a regression beyond the tolerance.
+    """
+    metrics = [
+        # (name, current, baseline, True if higher is better)
+        ("throughput", report["throughput"], baseline["throughput"], True),
+        ("p50_ms", report["latency_ms"]["p50"], baseline["latency_ms"]["p50"], False),
+        ("p99_ms", report["latency_ms"]["p99"], baseline["latency_ms"]["p99"], False),
+        (
+            "peak_rss_mb",
+            report["memory"]["peak_rss_mb"],
+            baseline["memory"]["peak_rss_mb"],
+            False,
+        ),
+    ]
+    rows = []
+    for name, current, previous, higher_is_better in metrics:
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        regression = -change > tolerance if higher_is_better else change > tolerance
+        rows.append(
+            {
+                "metric": name,
+                "baseline": previous,
+                "current": current,
+                "change": change,
+                "regression": regression,
+            }
+        )
+    rows.append(
+        {
+            "metric": "error_rate",
+            "baseline": baseline["error_rate"],
+            "current": report["error_rate"],
+            "change": report["error_rate"] - baseline["error_rate"],
+            "regression": report["error_rate"]
+            > baseline["error_rate"] + ERROR_RATE_TOLERANCE,
+        }
+    )
+    return rows
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    latency = report["latency_ms"]
+    memory = report["memory"]
+    lines = [
+        f"{report['scenario']}: {report['calls']} calls, concurrency {report['concurrency']}, "
+        f"{report['duration_seconds']:.2f}s",
+        f"  throughput   {report['throughput']:.1f} calls/s",
+        f"  latency ms   p50 {latency['p50'] or 0:.1f}  p90 {latency['p90'] or 0:.1f}  "
+        f"p99 {latency['p99'] or 0:.1f}  max {latency['max'] or 0:.1f}",
+        f"  errors       {report['errors']} ({report['error_rate']:.1%})",
+    ]
+    if memory["peak_rss_mb"] is not None:
+        lines.append(
+            f"  server rss   {memory['rss_start_mb']:.1f} -> {memory['rss_end_mb']:.1f} MB"
+            f" (peak {memory['peak_rss_mb']:.1f} MB)"
+        )
+    for tool, stats in report["tools"].items():
+        lines.append(
+            f"  {tool:<20} {stats['calls']:>6} calls {stats['errors']:>5} errors"
+            f"  p50 {stats['latency_ms']['p50']:.1f}  p99 {stats['latency_ms']['p99']:.1f} ms"
+        )
+    for sample in report["error_samples"]:
+        lines.append(f"  error: {sample}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = ["  vs baseline:"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"  {row['metric']:<12} {row['baseline']:>10.2f} -> {row['current']:>10.2f}"
+            f"  ({row['change']:+.1%}){flag}"
+        )
+    return "\n".join(lines)
@@ -1,13 +1,25 @@
 import os
+import time
 import asyncio
 import json
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Awaitable, Callable, Dict, List, Tuple
 from contextlib import AsyncExitStack
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
+
+from clients.prefetch import Prefetcher, PREFETCH_TOOL_NAME
+from clients.routing import (
+    MAIN_ROUTE,
+    Route,
+    Router,
+    RouteState,
+    RoutingPolicy,
+    tool_failed,
+)
+from clients.session import Session
 
 
 class Server:
@@ -18,6 +30,7 @@ class Server:
         self.config: Dict[str, Any] = config
         self.stdio_transport: Any = None
         self.session: Optional[ClientSession] = None
+        self.tools: List[Any] = []
         self.exit_stack: AsyncExitStack = AsyncExitStack()
 
     async def initialize(self) -> None:
@@ -38,12 +51,12 @@ class Server:
             )
             await self.session.initialize()
 
-            # List available tools
+            # List available tools once, they are cached for the session lifetime
             response = await self.session.list_tools()
-            tools = response.tools
+            self.tools = response.tools
             print(
                 f"\nConnected to server {self.name} with tools:",
-                [tool.name for tool in tools],
+                [tool.name for tool in self.tools],
             )
 
         except Exception as e:
@@ -57,10 +70,29 @@ class Server:
             await self.exit_stack.aclose()
             self.session = None
             self.stdio_transport = None
+            self.tools = []
         except Exception as e:
             print(f"Error during cleanup of server {self.name}: {e}")
 
 
+# Handler signature for tools implemented in-process by the client (e.g. the
+# orchestrator's dispatch tool) rather than by an MCP server.
+LocalToolHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# Receives progress events of the agent loop (turns, tool calls and results)
+EventHandler = Callable[[Dict[str, Any]], None]
+
+# Tool results are truncated to this many characters in events
+EVENT_CONTENT_CHARS = 2000
+
+
+def content_text(content: Any) -> str:
+    """Flatten tool result content (string or MCP content blocks) to text."""
+    if isinstance(content, str):
+        return content
+    return "\n".join(getattr(block, "text", str(block)) for block in content)
+
+
 class MCPClient:
     def __init__(
         self,
@@ -69,22 +101,36 @@ class MCPClient:
         max_tokens: int,
         max_iterations: int,
         system_prompt_path: str,
+        anthropic: Optional[AsyncAnthropic] = None,
+        prefetch: bool = False,
+        on_event: Optional[EventHandler] = None,
+        router: Optional[Router] = None,
     ):
         # Initialize session and client objects
         self.servers: Dict[str, Server] = {}
+        # Servers started by this client (shared servers are cleaned up by their owner)
+        self.owned_servers: Dict[str, Server] = {}
+        self.local_tools: Dict[str, Dict[str, Any]] = {}
         # default to os.getenv("ANTHROPIC_API_KEY")
-        self.anthropic = Anthropic()
+        self.anthropic = anthropic or AsyncAnthropic()
 
         # Configuration parameters
         self.model = model
         self.max_tokens = max_tokens
         self.max_iterations = max_iterations
+        # Picks the model of each turn, always the configured one unless a fast model is set
+        self.router = router or Router(model)
 
         # Create output directory
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
         print(f"Created output directory: {self.output_dir}")
 
+        self.on_event = on_event
+
+        # Warm likely next file reads in the servers while the model is generating
+        self.prefetcher = Prefetcher(self.output_dir) if prefetch else None
+
         # Load and modify system prompt
         with open(system_prompt_path, "r") as file:
             self.system_prompt = file.read()
@@ -104,18 +150,45 @@ class MCPClient:
         for name, server_config in config["mcpServers"].items():
             server = Server(name, server_config)
             await server.initialize()
-            self.servers[name] = server
+            self.add_server(server, owned=True)
 
-    async def loop(self, query: str) -> List[Dict[str, Any]]:
-        """Process a query using Claude and available tools"""
-        messages = [{"role": "user", "content": query}]
+    def add_server(self, server: Server, owned: bool = False) -> None:
+        """Attach an initialized server to this client.
+
+        Args:
+            server: Server whose session is already initialized.
+            owned: If True, the server is cleaned up together with this client.
+        """
+        self.servers[server.name] = server
+        if owned:
+            self.owned_servers[server.name] = server
 
-        # Collect all available tools from all servers
+    def register_local_tool(
+        self,
+        name: str,
+        description: str,
+        input_schema: Dict[str, Any],
+        handler: LocalToolHandler,
+    ) -> None:
+        """Expose an in-process tool to the model alongside the MCP server tools."""
+        self.local_tools[name] = {
+            "definition": {
+                "name": name,
+                "description": description,
+                "input_schema": input_schema,
+            },
+            "handler": handler,
+        }
+
+    def available_tools(self) -> List[Dict[str, Any]]:
+        """Collect all available tools from all servers and local tools."""
         available_tools = []
         for server_name, server in self.servers.items():
             if server.session:
-                response = await server.session.list_tools()
-                for tool in response.tools:
+                for tool in server.tools:
+                    # Internal tools used by the client itself
+                    if tool.name == PREFETCH_TOOL_NAME:
+                        continue
                     available_tools.append(
                         {
                             "name": tool.name,
@@ -123,6 +196,100 @@ class MCPClient:
                             "input_schema": tool.inputSchema,
                         }
                     )
+        for local_tool in self.local_tools.values():
+            available_tools.append(local_tool["definition"])
+        return available_tools
+
+    def find_server(self, tool_name: str) -> Optional[Server]:
+        """Return the server exposing a tool, if any."""
+        for server_name, server in self.servers.items():
+            if server.session and any(tool.name == tool_name for tool in server.tools):
+                return server
+        return None
+
+    async def call_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> Any:
+        """Execute a tool call on the server (or local handler) exposing it.
+
+        Returns:
+            The tool result content, or None if no server has the tool.
+        """
+        if tool_name in self.local_tools:
+            result = await self.local_tools[tool_name]["handler"](tool_args)
+            return result if isinstance(result, str) else json.dumps(result)
+
+        # Find the server that has this tool
+        server = self.find_server(tool_name)
+        if server is None:
+            return None
+        result = await server.session.call_tool(tool_name, tool_args)
+        return result.content
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Send a progress event to the event handler, if any."""
+        if self.on_event:
+            self.on_event(event)
+
+    async def create_message(
+        self, model: str, session: Session, tools: List[Dict[str, Any]]
+    ) -> Any:
+        return await self.anthropic.messages.create(
+            model=model,
+            system=self.system_prompt,
+            max_tokens=self.max_tokens,
+            messages=session.messages(),
+            tools=tools,
+        )
+
+    async def request(
+        self, session: Session, tools: List[Dict[str, Any]], state: RouteState
+    ) -> Tuple[Route, Any, float]:
+        """Get the next turn from the routed model.
+
+        A turn the fast model fails or truncates is redone on the main model.
+
+        Returns:
+            The route used, the response and its latency in seconds.
+        """
+        route = self.router.choose(state)
+        while True:
+            self.emit(
+                {
+                    "type": "route",
+                    "iteration": state.iteration,
+                    "route": route.name,
+                    "model": route.model,
+                    "reason": route.reason,
+                }
+            )
+            start = time.perf_counter()
+            try:
+                response = await self.create_message(route.model, session, tools)
+            except Exception:
+                self.router.record(route, time.perf_counter() - start, success=False)
+                if route.name == MAIN_ROUTE:
+                    raise
+                response = None
+            seconds = time.perf_counter() - start
+            if route.name == MAIN_ROUTE or (
+                response is not None and response.stop_reason != "max_tokens"
+            ):
+                return route, response, seconds
+            if response is not None:
+                self.router.record(route, seconds, success=False)
+            self.router.escalate(state)
+            route = self.router.main_route("fast model failed")
+
+    async def loop(self, query: str) -> List[Dict[str, Any]]:
+        """Process a query using Claude and available tools"""
+        # Past turns are kept in request form, only new turns are converted
+        session = Session()
+        session.append("user", query)
+        state = RouteState()
+
+        available_tools = self.available_tools()
+        prefetch_server = (
+            self.find_server(PREFETCH_TOOL_NAME) if self.prefetcher else None
+        )
 
         # Main agent loop (with iteration limit to prevent runaway API costs)
         iterations = 0
@@ -131,20 +298,30 @@ class MCPClient:
             # Set up optional thinking parameter (for Claude 3.7 Sonnet)
             thinking = None
 
-            # Call the Claude API
-            response = self.anthropic.messages.create(
-                model=self.model,
-                system=self.system_prompt,
-                max_tokens=self.max_tokens,
-                messages=messages,
-                tools=available_tools,
+            if prefetch_server:
+                self.prefetcher.start(prefetch_server.session)
+
+            # Call the Claude API, on the model routed for this turn
+            state.iteration = iterations
+            state.context_bytes = session.size
+            route, response, seconds = await self.request(
+                session, available_tools, state
             )
 
             # Add Claude's response to the conversation history
             response_content = response.content
-            messages.append({"role": "assistant", "content": response_content})
+            session.append("assistant", response_content)
 
             print(f"Claude's response: {response_content}")
+            self.emit(
+                {
+                    "type": "turn",
+                    "iteration": iterations,
+                    "text": "\n".join(
+                        block.text for block in response_content if block.type == "text"
+                    ),
+                }
+            )
 
             # Check if Claude used any tools
             tool_results = []
@@ -154,27 +331,21 @@ class MCPClient:
                     tool_args = block.input
 
                     print(f"Calling tool {tool_name} with args {tool_args}")
+                    if self.prefetcher:
+                        self.prefetcher.observe(tool_name, tool_args)
+                    self.emit(
+                        {"type": "tool_call", "name": tool_name, "input": tool_args}
+                    )
+
+                    tool_result = await self.call_tool(tool_name, tool_args)
 
-                    # Find the server that has this tool
-                    tool_result = None
-                    for server_name, server in self.servers.items():
-                        if server.session:
-                            response = await server.session.list_tools()
-                            if any(tool.name == tool_name for tool in response.tools):
-                                # Execute tool call
-                                result = await server.session.call_tool(
-                                    tool_name, tool_args
-                                )
-                                tool_result = result
-                                break
-
-                    if tool_result:
+                    if tool_result is not None:
                         # Format the result for Claude
                         tool_results.append(
                             {
                                 "type": "tool_result",
                                 "tool_use_id": block.id,
-                                "content": tool_result.content,
+                                "content": tool_result,
                             }
                         )
                     else:
@@ -186,13 +357,32 @@ class MCPClient:
                                 "content": f"Error: Tool {tool_name} not found in any server",
                             }
                         )
+                    self.emit(
+                        {
+                            "type": "tool_result",
+                            "name": tool_name,
+                            "content": content_text(tool_results[-1]["content"])[
+                                :EVENT_CONTENT_CHARS
+                            ],
+                        }
+                    )
+
+            failed = any(tool_failed(result["content"]) for result in tool_results)
+            self.router.record(route, seconds, success=not failed)
+            if failed and route.name != MAIN_ROUTE:
+                self.router.escalate(state)
+            state.pending_tools = len(tool_results)
 
             # If no tools were used, Claude is done - return the final messages
             if not tool_results:
-                return messages
+                break
 
             # Add tool results to messages for the next iteration with Claude
-            messages.append({"role": "user", "content": tool_results})
+            session.append("user", tool_results)
+
+        if self.prefetcher:
+            await self.prefetcher.drain()
+        return session.messages()
 
     async def chat(self):
         """Run an interactive chat loop"""
@@ -214,10 +404,21 @@ class MCPClient:
 
     async def cleanup(self):
         """Clean up resources"""
-        for server_name, server in self.servers.items():
+        for server_name, server in self.owned_servers.items():
             await server.cleanup()
 
 
+def final_text(messages: List[Dict[str, Any]]) -> str:
+    """Extract the text of the last assistant turn of a conversation."""
+    for message in reversed(messages):
+        if message["role"] != "assistant":
+            continue
+        return "\n".join(
+            block["text"] for block in message["content"] if block["type"] == "text"
+        )
+    return ""
+
+
 async def run_client(
     server_config_path: str,
     output_dir: str,
@@ -225,14 +426,22 @@ async def run_client(
     max_tokens: int,
     max_iterations: int,
     system_prompt_path: str,
+    prefetch: bool = False,
+    fast_model: Optional[str] = None,
+    routing_policy: Optional[RoutingPolicy] = None,
 ):
-    """Run the MCP client with specified parameters"""
+    """Run the MCP client with specified parameters.
+
+    `routing_policy` takes precedence over `fast_model`.
+    """
     client = MCPClient(
         output_dir=output_dir,
         model=model,
         max_tokens=max_tokens,
         max_iterations=max_iterations,
         system_prompt_path=system_prompt_path,
+        prefetch=prefetch,
+        router=Router(model, routing_policy or RoutingPolicy(fast_model=fast_model)),
     )
     try:
         # Initialize servers from config file
@@ -0,0 +1,345 @@
+import os
+import re
+import uuid
+import asyncio
+import json
+from typing import Optional, Any, Dict, List, Set
+
+from anthropic import AsyncAnthropic
+
+from clients.agents import AgentSpec, discover_agents
+from clients.main import EventHandler, MCPClient, Server, final_text
+from clients.routing import Router
+from clients.workspace import Overlay
+
+DISPATCH_TOOL_NAME = "dispatch_tasks"
+
+# Task ids name a directory under the agent output dir, they must stay inside it
+TASK_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+def check_task_id(task_id: Any) -> None:
+    """Raise ValueError if a task id could escape the agent output directory."""
+    if (
+        not isinstance(task_id, str)
+        or not TASK_ID_PATTERN.match(task_id)
+        or ".." in task_id
+        or task_id == "."
+    ):
+        raise ValueError(
+            f"Invalid task_id {task_id!r}: use letters, digits, '.', '_' and '-' only"
+        )
+
+
+class ServerPool:
+    """Shares MCP server connections between agents with identical server configs."""
+
+    def __init__(self) -> None:
+        self.servers: Dict[str, Server] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def key(config: Dict[str, Any]) -> str:
+        """Identity of a server config: same command, args and env share a process."""
+        return json.dumps(
+            {
+                "command": config["command"],
+                "args": config.get("args", []),
+                "env": config.get("env") or {},
+            },
+            sort_keys=True,
+        )
+
+    async def acquire(self, name: str, config: Dict[str, Any]) -> Server:
+        """Return the running server for this config, starting it on first use."""
+        key = self.key(config)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self.servers:
+                server = Server(name, config)
+                await server.initialize()
+                self.servers[key] = server
+            return self.servers[key]
+
+    async def cleanup(self) -> None:
+        """Clean up every pooled server, most recently started first."""
+        for server in reversed(list(self.servers.values())):
+            await server.cleanup()
+        self.servers.clear()
+
+
+class Orchestrator:
+    """Runs several agents concurrently in one event loop over a shared server pool.
+
+    Example:
+        async with Orchestrator.from_agents_dir("agents") as orchestrator:
+            results = await orchestrator.gather(
+                [
+                    {"agent": "hello_world", "query": "Write hello.py"},
+                    {"agent": "modal_engine", "query": "Deploy an echo API"},
+                ]
+            )
+    """
+
+    def __init__(
+        self,
+        agents: Dict[str, AgentSpec],
+        anthropic: Optional[AsyncAnthropic] = None,
+    ) -> None:
+        self.agents = agents
+        self.pool = ServerPool()
+        # default to os.getenv("ANTHROPIC_API_KEY")
+        self.anthropic = anthropic or AsyncAnthropic()
+        # Per-agent concurrency quotas
+        self.semaphores: Dict[str, asyncio.Semaphore] = {
+            name: asyncio.Semaphore(spec.max_concurrency)
+            for name, spec in agents.items()
+        }
+        # Per-agent model routing, shared by the agent's tasks to aggregate statistics
+        self.routers: Dict[str, Router] = {
+            name: Router(spec.model, spec.routing_policy())
+            for name, spec in agents.items()
+        }
+        # Planner agent name -> worker agent names it may dispatch to
+        self.dispatchers: Dict[str, List[str]] = {}
+        # Agent name -> {server name: Server}
+        self.agent_servers: Dict[str, Dict[str, Server]] = {}
+
+    @classmethod
+    def from_agents_dir(
+        cls,
+        agents_root: str = "agents",
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> "Orchestrator":
+        """Build an orchestrator over every agent found under `agents_root`."""
+        return cls(discover_agents(agents_root, overrides), **kwargs)
+
+    async def __aenter__(self) -> "Orchestrator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.cleanup()
+
+    async def start(self, agent_names: Optional[List[str]] = None) -> None:
+        """Connect the servers of the given agents (all agents by default).
+
+        Servers are started sequentially from the calling task: the stdio transports
+        must be closed by the same task that opened them, so call `start` (or use the
+        orchestrator as a context manager) before fanning tasks out.
+        """
+        for name in agent_names or list(self.agents):
+            await self.connect(name)
+
+    async def connect(self, agent_name: str) -> Dict[str, Server]:
+        """Acquire the pooled servers listed in an agent's server config."""
+        if agent_name not in self.agent_servers:
+            config = self.agents[agent_name].load_server_config()
+            servers = {}
+            for name, server_config in config.items():
+                servers[name] = await self.pool.acquire(name, server_config)
+            self.agent_servers[agent_name] = servers
+        return self.agent_servers[agent_name]
+
+    def enable_dispatch(self, planner: str, workers: List[str]) -> None:
+        """Give a planner agent a tool to fan sub-tasks out to worker agents.
+
+        Args:
+            planner: Name of the agent receiving the dispatch tool.
+            workers: Names of the agents the planner may dispatch to.
+        """
+        unknown = [name for name in [planner, *workers] if name not in self.agents]
+        if unknown:
+            raise ValueError(f"Unknown agents: {', '.join(unknown)}")
+        if planner in workers:
+            raise ValueError(f"Agent {planner} cannot dispatch tasks to itself")
+        # A cycle (A -> B -> A) can deadlock on the per-agent concurrency quotas
+        for worker in workers:
+            if planner in self.reachable_workers(worker):
+                raise ValueError(
+                    f"Agent {worker} already dispatches tasks to {planner}, "
+                    "dispatch cycles are not allowed"
+                )
+        self.dispatchers[planner] = list(workers)
+
+    def reachable_workers(self, agent_name: str) -> Set[str]:
+        """Agents an agent can dispatch to, directly or through its workers."""
+        reached: Set[str] = set()
+        pending = list(self.dispatchers.get(agent_name, []))
+        while pending:
+            name = pending.pop()
+            if name not in reached:
+                reached.add(name)
+                pending.extend(self.dispatchers.get(name, []))
+        return reached
+
+    def create_client(
+        self,
+        spec: AgentSpec,
+        output_dir: str,
+        on_event: Optional[EventHandler] = None,
+    ) -> MCPClient:
+        """Create a client for one task of an agent."""
+        return MCPClient(
+            output_dir=output_dir,
+            model=spec.model,
+            max_tokens=spec.max_tokens,
+            max_iterations=spec.max_iterations,
+            system_prompt_path=spec.system_prompt_path,
+            anthropic=self.anthropic,
+            prefetch=spec.prefetch,
+            on_event=on_event,
+            router=self.routers[spec.name],
+        )
+
+    async def run(
+        self,
+        agent_name: str,
+        query: str,
+        task_id: Optional[str] = None,
+        on_event: Optional[EventHandler] = None,
+    ) -> Dict[str, Any]:
+        """Run a single query on an agent, waiting for a free slot in its quota.
+
+        Args:
+            agent_name: Name of the agent to run.
+            query: User query for the agent.
+            task_id: Optional id, also used as a subdirectory of the agent output dir
+                (or as the session id of its overlay if the agent is isolated).
+            on_event: Optional callback receiving the progress events of the agent loop.
+
+        Returns:
+            Dictionary with the agent name, task id, output dir, final text and messages.
+            Isolated agents also get the committed and conflicting files.
+
+        Raises:
+            ValueError: If the task id is not a plain directory name.
+        """
+        if task_id is not None:
+            check_task_id(task_id)
+        spec = self.agents[agent_name]
+        if spec.isolate:
+            output_dir = spec.output_dir
+        else:
+            output_dir = (
+                os.path.join(spec.output_dir, task_id) if task_id else spec.output_dir
+            )
+        servers = await self.connect(agent_name)
+
+        async with self.semaphores[agent_name]:
+            overlay = None
+            if spec.isolate:
+                overlay = Overlay(
+                    output_dir, task_id or uuid.uuid4().hex[:12], spec.template_dir
+                )
+                await asyncio.to_thread(overlay.create)
+            client = self.create_client(
+                spec, overlay.path if overlay else output_dir, on_event
+            )
+            for server in servers.values():
+                client.add_server(server)
+            if agent_name in self.dispatchers:
+                self.register_dispatch_tool(client, self.dispatchers[agent_name])
+
+            try:
+                messages = await client.loop(query)
+            except BaseException:
+                # Nothing of a failed session reaches the shared output dir
+                if overlay:
+                    await asyncio.to_thread(overlay.discard)
+                raise
+            result = {
+                "agent": agent_name,
+                "task_id": task_id,
+                "output_dir": output_dir,
+                "text": final_text(messages),
+                "messages": messages,
+            }
+            if overlay:
+                result.update(await asyncio.to_thread(overlay.commit))
+            return result
+
+    async def gather(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fan tasks out to their agents concurrently and collect the results in order.
+
+        Args:
+            tasks: List of {"agent": name, "query": str, "task_id": optional str}.
+                Tasks without a task_id get a unique one, so their outputs clobber
+                neither each other nor those of other gather calls.
+
+        Returns:
+            One result per task. Failed tasks have an "error" entry instead of raising.
+        """
+        for agent_name in {task["agent"] for task in tasks}:
+            if agent_name in self.agents:
+                await self.connect(agent_name)
+
+        async def run_task(task: Dict[str, Any]) -> Dict[str, Any]:
+            task_id = task.get("task_id")
+            if task_id is None:
+                task_id = f"task-{uuid.uuid4().hex[:12]}"
+            if task["agent"] not in self.agents:
+                return {
+                    "agent": task["agent"],
+                    "task_id": task_id,
+                    "error": f"Unknown agent {task['agent']}",
+                }
+            try:
+                return await self.run(task["agent"], task["query"], task_id)
+            except Exception as e:
+                return {"agent": task["agent"], "task_id": task_id, "error": str(e)}
+
+        return await asyncio.gather(*(run_task(task) for task in tasks))
+
+    def register_dispatch_tool(self, client: MCPClient, workers: List[str]) -> None:
+        """Expose the worker agents to a planner client as a local tool."""
+
+        async def dispatch(tool_args: Dict[str, Any]) -> List[Dict[str, Any]]:
+            tasks = tool_args.get("tasks", [])
+            for task in tasks:
+                if task.get("agent") not in workers:
+                    return [
+                        {
+                            "error": f"Agent {task.get('agent')} is not a worker of this planner"
+                        }
+                    ]
+            results = await self.gather(tasks)
+            # The planner only needs the outcome, not the full worker transcripts
+            return [
+                {key: value for key, value in result.items() if key != "messages"}
+                for result in results
+            ]
+
+        client.register_local_tool(
+            name=DISPATCH_TOOL_NAME,
+            description=(
+                "Dispatch sub-tasks to worker agents. The tasks run concurrently and "
+                "the final answer of each worker is returned. Available workers: "
+                + ", ".join(workers)
+            ),
+            input_schema={
+                "type": "object",
+                "properties": {
+                    "tasks": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "agent": {"type": "string", "enum": workers},
+                                "query": {"type": "string"},
+                                "task_id": {"type": "string"},
+                            },
+                            "required": ["agent", "query"],
+                        },
+                    }
+                },
+                "required": ["tasks"],
+            },
+            handler=dispatch,
+        )
+
+    async def cleanup(self) -> None:
+        """Clean up all pooled servers."""
+        await self.pool.cleanup()
+        self.agent_servers.clear()
@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List
+
+PREFETCH_TOOL_NAME = "prefetch_files"
+READ_TOOL_NAME = "read_file"
+WRITE_TOOL_NAME = "write_file"
+
+
+class Prefetcher:
+    """Predicts the next file reads of an agent and warms them while the model runs.
+
+    Candidates, in priority order:
+    - files written by the agent (through a tool or a command) since the last turn
+    - files the agent read recently, which are often read again after an edit
+
+    Predictions are sent to the server exposing the `prefetch_files` tool, which loads
+    them into its read cache so the next `read_file` call does not touch the disk.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        max_files: int = 8,
+        max_bytes: int = 512 * 1024,
+        max_concurrency: int = 1,
+        max_scanned_entries: int = 2000,
+    ) -> None:
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_scanned_entries = max_scanned_entries
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Most recently used paths last
+        self.recent_reads: "OrderedDict[str, None]" = OrderedDict()
+        self.recent_writes: "OrderedDict[str, None]" = OrderedDict()
+        self.last_scan = time.time()
+        self.tasks: List["asyncio.Task[None]"] = []
+
+    def observe(self, tool_name: str, tool_args: Dict[str, Any]) -> None:
+        """Record a tool call made by the agent."""
+        path = tool_args.get("file_path") if isinstance(tool_args, dict) else None
+        if not isinstance(path, str):
+            return
+        path = os.path.abspath(path)
+        if tool_name == READ_TOOL_NAME:
+            recent = self.recent_reads
+        elif tool_name == WRITE_TOOL_NAME:
+            recent = self.recent_writes
+        else:
+            return
+        recent.pop(path, None)
+        recent[path] = None
+        while len(recent) > self.max_files:
+            recent.popitem(last=False)
+
+    def changed_outputs(self) -> List[str]:
+        """Files under output_dir modified since the previous scan, newest first."""
+        since, self.last_scan = self.last_scan, time.time()
+        changed = []
+        scanned = 0
+        for directory, dirnames, filenames in os.walk(self.output_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                scanned += 1
+                if scanned > self.max_scanned_entries:
+                    return [path for _, path in sorted(changed, reverse=True)]
+                path = os.path.abspath(os.path.join(directory, filename))
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if mtime >= since:
+                    changed.append((mtime, path))
+        return [path for _, path in sorted(changed, reverse=True)]
+
+    def predict(self, writes: List[str], reads: List[str]) -> List[str]:
+        """Order the candidates, most likely next read first.
+
+        Scans the output dir, so it runs in a worker thread.
+        """
+        candidates = writes + self.changed_outputs() + reads
+        predictions = []
+        for path in candidates:
+            if path not in predictions:
+                predictions.append(path)
+        return predictions[: self.max_files]
+
+    def start(self, session: Any) -> None:
+        """Warm the predicted reads in the background, without waiting for them."""
+        self.tasks = [task for task in self.tasks if not task.done()]
+        # Writes only predict the reads of the next turn
+        writes = list(reversed(self.recent_writes))
+        self.recent_writes.clear()
+        if self.semaphore.locked():
+            # The previous prefetch is still running, do not pile up more work
+            return
+        reads = list(reversed(self.recent_reads))
+        self.tasks.append(asyncio.create_task(self.prefetch(session, writes, reads)))
+
+    async def prefetch(self, session: Any, writes: List[str], reads: List[str]) -> None:
+        async with self.semaphore:
+            try:
+                # The output dir scan must not delay the other sessions of the loop
+                paths = await asyncio.to_thread(self.predict, writes, reads)
+                if not paths:
+                    return
+                await session.call_tool(
+                    PREFETCH_TOOL_NAME,
+                    {"file_paths": paths, "max_bytes": self.max_bytes},
+                )
+            except Exception as e:
+                # Prefetching is an optimization only, never fail the agent loop
+                print(f"Prefetch failed: {e}")
+
+    async def drain(self) -> None:
+        """Wait for the prefetches still running."""
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
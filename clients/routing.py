@@ -0,0 +1,138 @@
+import json
+from dataclasses import dataclass
+from typing import Optional, Any, Dict
+
+MAIN_ROUTE = "main"
+FAST_ROUTE = "fast"
+
+
+@dataclass
+class RoutingPolicy:
+    """When a turn of the agent loop may go to the fast model instead of the main one.
+
+    A turn is routed to the fast model only if every condition holds, otherwise it
+    goes to the main (configured) model.
+    """
+
+    # Smaller, faster model for simple turns, routing is disabled if None
+    fast_model: Optional[str] = None
+    # The first turn plans the work from the user query, keep it on the main model
+    fast_first_turn: bool = False
+    # Tool results the turn has to process, more usually means a bigger decision
+    max_pending_tools: int = 1
+    # Encoded size of the conversation, long contexts go to the main model
+    max_context_bytes: int = 64 * 1024
+    # Turns kept on the main model after a failure of the fast model
+    escalation_turns: int = 2
+
+
+@dataclass
+class Route:
+    name: str
+    model: str
+    reason: str
+
+
+@dataclass
+class RouteState:
+    """Routing inputs of one conversation, updated by the agent loop."""
+
+    iteration: int = 0
+    pending_tools: int = 0
+    context_bytes: int = 0
+    # Remaining turns forced on the main model
+    escalated: int = 0
+
+
+class RouteStats:
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.calls = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "failures": self.failures,
+            "success_rate": (
+                (self.calls - self.failures) / self.calls if self.calls else None
+            ),
+            "mean_seconds": self.seconds / self.calls if self.calls else None,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class Router:
+    """Picks the model of every turn and records per-route latency and success.
+
+    A router can be shared by the clients of an agent to aggregate its statistics,
+    the per-conversation state lives in RouteState.
+    """
+
+    def __init__(self, model: str, policy: Optional[RoutingPolicy] = None) -> None:
+        self.model = model
+        self.policy = policy or RoutingPolicy()
+        self.routes: Dict[str, RouteStats] = {MAIN_ROUTE: RouteStats(model)}
+        if self.policy.fast_model:
+            self.routes[FAST_ROUTE] = RouteStats(self.policy.fast_model)
+        self.escalations = 0
+
+    def main_route(self, reason: str) -> Route:
+        return Route(MAIN_ROUTE, self.model, reason)
+
+    def choose(self, state: RouteState) -> Route:
+        policy = self.policy
+        if not policy.fast_model:
+            return self.main_route("routing disabled")
+        if state.escalated > 0:
+            state.escalated -= 1
+            return self.main_route("escalated after a failure")
+        if state.iteration <= 1 and not policy.fast_first_turn:
+            return self.main_route("first turn")
+        if state.pending_tools > policy.max_pending_tools:
+            return self.main_route(f"{state.pending_tools} tool results")
+        if state.context_bytes > policy.max_context_bytes:
+            return self.main_route(f"context of {state.context_bytes} bytes")
+        return Route(FAST_ROUTE, policy.fast_model, "simple turn")
+
+    def escalate(self, state: RouteState) -> None:
+        """Keep the next turns of a conversation on the main model."""
+        self.escalations += 1
+        state.escalated = self.policy.escalation_turns
+
+    def record(self, route: Route, seconds: float, success: bool) -> None:
+        stats = self.routes[route.name]
+        stats.calls += 1
+        stats.failures += 0 if success else 1
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": {name: stats.to_dict() for name, stats in self.routes.items()},
+            "escalations": self.escalations,
+        }
+
+
+def tool_failed(content: Any) -> bool:
+    """Guess whether a tool result reports an error.
+
+    Utils tools return "Error ..." strings and CLI-backed tools a JSON object with
+    "success": false.
+    """
+    if content is None:
+        return True
+    if not isinstance(content, str):
+        content = "\n".join(getattr(block, "text", "") for block in content)
+    text = content.lstrip()
+    if text.startswith("Error"):
+        return True
+    if text.startswith("{"):
+        try:
+            return json.loads(text).get("success") is False
+        except (ValueError, AttributeError):
+            return False
+    return False
@@ -0,0 +1,303 @@
+"""HTTP/WebSocket front-end running agent jobs on a shared, warm server pool.
+
+Endpoints:
+    GET  /agents              agents that can be queried
+    POST /jobs                {"agent", "query", "task_id"?} -> 202 {"job_id"}, 429 if the queue is full
+    GET  /jobs/{job_id}       status and final text of a job
+    GET  /jobs/{job_id}/events  progress events as newline-delimited JSON, until the job ends
+    WS   /ws                  send {"agent", "query"}, receive the job's events, then the socket closes
+    GET  /metrics             queue depth, running jobs and counters
+"""
+
+import time
+import json
+import uuid
+import asyncio
+import contextlib
+from collections import OrderedDict
+from typing import Optional, Any, AsyncIterator, Dict, List, Set
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from clients.orchestrator import Orchestrator, check_task_id
+
+# Events kept per job for clients subscribing late
+MAX_JOB_EVENTS = 1000
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 1000
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the job queue is full."""
+
+
+class Job:
+    def __init__(self, job_id: str, agent: str, query: str, task_id: str) -> None:
+        self.job_id = job_id
+        self.agent = agent
+        self.query = query
+        self.task_id = task_id
+        self.status = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.text: Optional[str] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.listeners: Set[asyncio.Queue] = set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_EVENTS
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        event = {"job_id": self.job_id, **event}
+        if len(self.events) < MAX_JOB_EVENTS:
+            self.events.append(event)
+        for listener in self.listeners:
+            listener.put_nowait(event)
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield past events, then live events until the job ends."""
+        listener: asyncio.Queue = asyncio.Queue()
+        # Snapshot and subscribe together: later events only arrive via the listener
+        past = list(self.events)
+        self.listeners.add(listener)
+        try:
+            for event in past:
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+            while not (self.done and listener.empty()):
+                event = await listener.get()
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            self.listeners.discard(listener)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "agent": self.agent,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "text": self.text,
+            "error": self.error,
+        }
+
+
+class AgentService:
+    """Bounded job queue in front of an orchestrator, drained by a pool of workers."""
+
+    def __init__(
+        self, orchestrator: Orchestrator, workers: int = 4, max_queue: int = 64
+    ) -> None:
+        self.orchestrator = orchestrator
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.worker_tasks: List["asyncio.Task[None]"] = []
+        self.running = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self.run_seconds = 0.0
+
+    async def __aenter__(self) -> "AgentService":
+        await self.orchestrator.start()
+        self.worker_tasks = [
+            asyncio.create_task(self.worker()) for _ in range(self.workers)
+        ]
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        await self.orchestrator.cleanup()
+
+    def submit(self, agent: str, query: str, task_id: Optional[str] = None) -> Job:
+        """Queue a job without waiting for it.
+
+        Raises:
+            KeyError: If the agent does not exist.
+            ValueError: If the task id is not a plain directory name.
+            QueueFullError: If the queue is full; the caller should retry later.
+        """
+        if agent not in self.orchestrator.agents:
+            raise KeyError(agent)
+        if task_id is not None:
+            check_task_id(task_id)
+        # Unique across restarts: the id also names the job's output directory
+        job_id = f"job-{uuid.uuid4().hex[:12]}"
+        job = Job(job_id, agent, query, task_id or job_id)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            raise QueueFullError(f"Job queue is full ({self.queue.maxsize} jobs)")
+        self.counters["submitted"] += 1
+        self.jobs[job_id] = job
+        self.forget_finished()
+        job.publish({"type": "queued", "agent": agent})
+        return job
+
+    def forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.execute(job)
+            finally:
+                self.queue.task_done()
+
+    async def execute(self, job: Job) -> None:
+        job.status = "running"
+        job.started = time.time()
+        self.running += 1
+        job.publish({"type": "started"})
+        try:
+            result = await self.orchestrator.run(
+                job.agent, job.query, task_id=job.task_id, on_event=job.publish
+            )
+            job.text = result["text"]
+            job.status = "completed"
+            self.counters["completed"] += 1
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            self.counters["failed"] += 1
+        finally:
+            self.running -= 1
+            job.finished = time.time()
+            self.run_seconds += job.finished - job.started
+        if job.status == "completed":
+            job.publish({"type": "completed", "text": job.text})
+        else:
+            job.publish({"type": "failed", "error": job.error})
+
+    def metrics(self) -> Dict[str, Any]:
+        finished = self.counters["completed"] + self.counters["failed"]
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "running": self.running,
+            "workers": self.workers,
+            **self.counters,
+            "mean_run_seconds": self.run_seconds / finished if finished else None,
+            "routing": {
+                name: router.stats()
+                for name, router in self.orchestrator.routers.items()
+            },
+        }
+
+
+def create_app(service: AgentService) -> Starlette:
+    """Build the Starlette application serving the given agent service."""
+
+    async def list_agents(request: Request) -> JSONResponse:
+        return JSONResponse(sorted(service.orchestrator.agents))
+
+    async def submit_job(request: Request) -> JSONResponse:
+        try:
+            body = await request.json()
+            agent, query = body["agent"], body["query"]
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse(
+                {"error": "Body must be a JSON object with agent and query"},
+                status_code=400,
+            )
+        try:
+            job = service.submit(agent, query, body.get("task_id"))
+        except KeyError:
+            return JSONResponse({"error": f"Unknown agent {agent}"}, status_code=404)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except QueueFullError as e:
+            return JSONResponse(
+                {"error": str(e), **service.metrics()},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(
+            {"job_id": job.job_id, "queue_depth": service.queue.qsize()},
+            status_code=202,
+        )
+
+    def find_job(request: Request) -> Optional[Job]:
+        return service.jobs.get(request.path_params["job_id"])
+
+    async def get_job(request: Request) -> JSONResponse:
+        job = find_job(request)
+        if job is None:
+            return JSONResponse({"error": "Unknown job"}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    async def job_events(request: Request) -> Any:
+        job = find_job(request)
+        if job is None:
+            return JSONResponse({"error": "Unknown job"}, status_code=404)
+
+        async def ndjson() -> AsyncIterator[str]:
+            async for event in job.stream():
+                yield json.dumps(event, default=str) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    async def websocket_job(websocket: WebSocket) -> None:
+        await websocket.accept()
+        try:
+            body = await websocket.receive_json()
+            job = service.submit(body["agent"], body["query"], body.get("task_id"))
+        except QueueFullError as e:
+            # 1013: try again later
+            await websocket.send_json({"type": "rejected", "error": str(e)})
+            await websocket.close(code=1013)
+            return
+        except (KeyError, TypeError, ValueError) as e:
+            error = (
+                str(e)
+                if isinstance(e, ValueError)
+                else "Expected a known agent and a query"
+            )
+            await websocket.send_json({"type": "rejected", "error": error})
+            await websocket.close(code=1008)
+            return
+        try:
+            async for event in job.stream():
+                await websocket.send_text(json.dumps(event, default=str))
+            await websocket.close()
+        except WebSocketDisconnect:
+            # The job keeps running, its result stays available over HTTP
+            pass
+
+    async def metrics(request: Request) -> JSONResponse:
+        return JSONResponse(service.metrics())
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        # Servers are started and stopped in this task, see Orchestrator.start
+        async with service:
+            yield
+
+    return Starlette(
+        routes=[
+            Route("/agents", list_agents),
+            Route("/jobs", submit_job, methods=["POST"]),
+            Route("/jobs/{job_id}", get_job),
+            Route("/jobs/{job_id}/events", job_events),
+            WebSocketRoute("/ws", websocket_job),
+            Route("/metrics", metrics),
+        ],
+        lifespan=lifespan,
+    )
@@ -0,0 +1,170 @@
+"""Compact conversation history for long agent sessions.
+
+Every turn is converted once, when it is appended, to the plain JSON form sent
+to the Messages API, so later requests reuse it as is instead of converting SDK
+response objects and MCP content blocks again on every call.
+
+Large strings (file contents, command output, generated code) are interned in a
+process-wide pool, so the same payload held by many turns or many concurrent
+sessions is stored once. Repeated content blocks are shared the same way.
+"""
+
+import json
+import hashlib
+import threading
+import weakref
+from typing import Optional, Any, Dict, List, Tuple
+
+# Strings at least this long are shared through the pool, shorter ones are cheaper to copy
+MIN_SHARED_CHARS = 256
+
+
+class Interned:
+    """Immutable value shared by every turn that holds an equal one."""
+
+    __slots__ = ("value", "__weakref__")
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+class InternPool:
+    """Weak pool of shared strings and content blocks.
+
+    Turns keep strong references to what they use, an entry disappears with the
+    last turn referencing it.
+    """
+
+    def __init__(self, min_chars: int = MIN_SHARED_CHARS) -> None:
+        self.min_chars = min_chars
+        self.entries: "weakref.WeakValueDictionary[Any, Interned]" = (
+            weakref.WeakValueDictionary()
+        )
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def intern(self, key: Any, value: Any) -> Interned:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            entry = Interned(value)
+            self.entries[key] = entry
+            return entry
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared by every session of the process
+POOL = InternPool()
+
+
+def to_plain(value: Any) -> Any:
+    """Convert SDK and MCP objects (pydantic models) to plain JSON values."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def encoded_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode())
+
+
+class Turn:
+    """One message of a session, in request form."""
+
+    __slots__ = ("role", "message", "size", "refs")
+
+    def __init__(
+        self,
+        role: str,
+        message: Dict[str, Any],
+        size: int,
+        refs: Tuple[Interned, ...],
+    ) -> None:
+        self.role = role
+        # Never mutated after creation, shared content may belong to other sessions
+        self.message = message
+        # Encoded size in bytes
+        self.size = size
+        self.refs = refs
+
+
+class Session:
+    """Append-only message history of one agent conversation."""
+
+    def __init__(self, pool: Optional[InternPool] = None) -> None:
+        self.pool = pool or POOL
+        self.turns: List[Turn] = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def append(self, role: str, content: Any) -> Turn:
+        """Add a message, converting and interning its content once."""
+        refs: List[Interned] = []
+        content = to_plain(content)
+        if isinstance(content, list):
+            content = [self.share_block(block, refs) for block in content]
+        else:
+            content = self.share(content, refs)
+        message = {"role": role, "content": content}
+        turn = Turn(role, message, encoded_size(message), tuple(refs))
+        self.turns.append(turn)
+        self.size += turn.size
+        return turn
+
+    def share(self, value: Any, refs: List[Interned]) -> Any:
+        """Replace large strings nested in a value with their pooled copy."""
+        if isinstance(value, str):
+            if len(value) < self.pool.min_chars:
+                return value
+            entry = self.pool.intern(value, value)
+            refs.append(entry)
+            return entry.value
+        if isinstance(value, dict):
+            return {key: self.share(item, refs) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.share(item, refs) for item in value]
+        return value
+
+    def share_block(self, block: Any, refs: List[Interned]) -> Any:
+        """Intern a content block, sharing it whole when it carries no id."""
+        if not isinstance(block, dict):
+            return self.share(block, refs)
+        if block.get("type") == "tool_result" and isinstance(
+            block.get("content"), list
+        ):
+            shared = {
+                key: self.share(value, refs)
+                for key, value in block.items()
+                if key != "content"
+            }
+            shared["content"] = [
+                self.share_block(inner, refs) for inner in block["content"]
+            ]
+            return shared
+        block = self.share(block, refs)
+        if "id" in block or "tool_use_id" in block:
+            # Unique per call, nothing to share beyond its strings
+            return block
+        encoded = json.dumps(block, sort_keys=True, ensure_ascii=False).encode()
+        if len(encoded) < self.pool.min_chars:
+            return block
+        key = ("block", hashlib.blake2b(encoded, digest_size=16).digest())
+        entry = self.pool.intern(key, block)
+        refs.append(entry)
+        return entry.value
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """Messages to send, reusing the converted form of every past turn."""
+        return [turn.message for turn in self.turns]
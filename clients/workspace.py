@@ -0,0 +1,182 @@
+"""Per-session overlays of an agent output directory.
+
+Concurrent sessions sharing an output directory each work in their own overlay,
+`<output_dir>/.sessions/<session_id>`, seeded with a copy-on-write clone of a
+template (or of the output directory itself). Files the session created or changed
+are committed back to the output directory only if the session succeeds, each one
+replaced atomically under the same per-path lock as the utils server's write_file.
+"""
+
+import os
+import fcntl
+import errno
+import shutil
+import tempfile
+from typing import Optional, Dict, Iterator, List, Tuple
+
+# Same per-path locks as the utils server's write_file
+from clients.locks import path_lock
+
+SESSIONS_DIR = ".sessions"
+
+# ioctl sharing the extents of a file with another one (btrfs, xfs, overlayfs, ...)
+FICLONE = 0x40049409
+
+
+def clone_file(src: str, dst: str) -> bool:
+    """Copy a file, sharing its blocks with the source when the filesystem allows it.
+
+    Returns:
+        True if the file was cloned, False if it had to be copied.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            cloned = True
+        except OSError as e:
+            if e.errno not in (
+                errno.EOPNOTSUPP,
+                errno.ENOTTY,
+                errno.EXDEV,
+                errno.EINVAL,
+            ):
+                raise
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+            cloned = False
+    shutil.copystat(src, dst)
+    return cloned
+
+
+def clone_tree(src: str, dst: str, skip: Tuple[str, ...] = ()) -> Dict[str, int]:
+    """Recursively clone a directory, copy-on-write where supported.
+
+    Args:
+        src: Directory to clone.
+        dst: Destination directory, created if needed. Existing files are overwritten.
+        skip: Names of top-level entries of `src` not to clone.
+
+    Returns:
+        Numbers of files cloned and copied.
+    """
+    counts = {"cloned": 0, "copied": 0}
+    for directory, dirnames, filenames in os.walk(src):
+        relative = os.path.relpath(directory, src)
+        if relative == ".":
+            dirnames[:] = [d for d in dirnames if d not in skip]
+            filenames = [f for f in filenames if f not in skip]
+        target = os.path.normpath(os.path.join(dst, relative))
+        os.makedirs(target, exist_ok=True)
+        for filename in filenames:
+            source = os.path.join(directory, filename)
+            if os.path.islink(source):
+                destination = os.path.join(target, filename)
+                if os.path.lexists(destination):
+                    os.unlink(destination)
+                os.symlink(os.readlink(source), destination)
+                continue
+            cloned = clone_file(source, os.path.join(target, filename))
+            counts["cloned" if cloned else "copied"] += 1
+    return counts
+
+
+def file_state(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def regular_files(root: str) -> Iterator[str]:
+    """Relative paths of the regular files under root."""
+    for directory, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield os.path.relpath(path, root)
+
+
+class Overlay:
+    """Private working copy of an output directory for one agent session.
+
+    Usage:
+        overlay = Overlay("agents/modal_engine/output", "task-1", template_dir="templates/api")
+        overlay.create()
+        ...  # the agent writes under overlay.path
+        result = overlay.commit()  # or overlay.discard() if the session failed
+    """
+
+    def __init__(
+        self, output_dir: str, session_id: str, template_dir: Optional[str] = None
+    ) -> None:
+        self.output_dir = os.path.abspath(output_dir)
+        self.session_id = session_id
+        self.template_dir = template_dir
+        self.path = os.path.join(self.output_dir, SESSIONS_DIR, session_id)
+        # Relative path -> state of the seeded file in the overlay and in the output dir
+        self.seeded: Dict[str, Tuple[int, int]] = {}
+        self.base_states: Dict[str, Tuple[int, int]] = {}
+
+    def create(self) -> Dict[str, int]:
+        """Create the overlay, seeded from the template or the current output dir."""
+        if os.path.exists(self.path):
+            raise FileExistsError(f"Session {self.session_id} already exists")
+        os.makedirs(self.path)
+        if self.template_dir:
+            counts = clone_tree(self.template_dir, self.path)
+        elif os.path.isdir(self.output_dir):
+            counts = clone_tree(self.output_dir, self.path, skip=(SESSIONS_DIR,))
+        else:
+            counts = {"cloned": 0, "copied": 0}
+        for relative in regular_files(self.path):
+            # Files of a template are all published, output dir files only if changed
+            if not self.template_dir:
+                self.seeded[relative] = file_state(os.path.join(self.path, relative))
+            base = os.path.join(self.output_dir, relative)
+            if os.path.isfile(base):
+                self.base_states[relative] = file_state(base)
+        return counts
+
+    def changed_files(self) -> List[str]:
+        """Files to publish: created or modified in the overlay, or from the template."""
+        changed = []
+        for relative in regular_files(self.path):
+            if self.seeded.get(relative) != file_state(
+                os.path.join(self.path, relative)
+            ):
+                changed.append(relative)
+        return sorted(changed)
+
+    def commit(self) -> Dict[str, List[str]]:
+        """Publish the changed files to the output directory and remove the overlay.
+
+        Each file is replaced atomically under its path lock. A file also changed in
+        the output directory by another session since this one started is still
+        overwritten (last commit wins) but reported as a conflict.
+
+        Deleting a seeded file in the overlay does not delete it from the output dir.
+        """
+        committed, conflicts = [], []
+        for relative in self.changed_files():
+            source = os.path.join(self.path, relative)
+            target = os.path.join(self.output_dir, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with path_lock(target):
+                if os.path.isfile(target) and (
+                    self.base_states.get(relative) != file_state(target)
+                ):
+                    conflicts.append(relative)
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}."
+                )
+                os.close(fd)
+                try:
+                    clone_file(source, tmp_path)
+                    os.replace(tmp_path, target)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            committed.append(relative)
+        self.discard()
+        return {"committed": committed, "conflicts": conflicts}
+
+    def discard(self) -> None:
+        """Remove the overlay without publishing anything."""
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -1,5 +1,6 @@
 import asyncio
 from clients.main import run_client
+from clients.orchestrator import Orchestrator
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,6 +28,27 @@ async def helloWorld():
     )
 
 
+async def concurrentAgents():
+    orchestrator = Orchestrator.from_agents_dir(
+        "agents",
+        overrides={
+            "hello_world": {
+                "output_dir": "./agents/hello_world/example_output",
+                "max_concurrency": 2,
+            }
+        },
+    )
+    async with orchestrator:
+        results = await orchestrator.gather(
+            [
+                {"agent": "hello_world", "query": "Write a hello world script."},
+                {"agent": "hello_world", "query": "Write a goodbye world script."},
+            ]
+        )
+    for result in results:
+        print(result["task_id"], result.get("text", result.get("error")))
+
+
 # Run one of the examples
 if __name__ == "__main__":
     asyncio.run(helloWorld())
@@ -0,0 +1,325 @@
+"""Turn declarative CLI command specs into MCP tools.
+
+A spec file describes the tools of a CLI-backed server:
+
+    {
+        "name": "modal",
+        "max_concurrency": 4,
+        "timeout": 60,
+        "max_output_bytes": 65536,
+        "tools": [
+            {
+                "name": "list_environments",
+                "description": "List all environments in the current workspace.",
+                "command": ["modal", "environment", "list"],
+                "read_only": true,
+                "cache_ttl": 300
+            },
+            {
+                "name": "create_environment",
+                "description": "Create a new environment in the current workspace.",
+                "command": ["modal", "environment", "create", "{name}"],
+                "params": {"name": {"type": "string", "required": true}},
+                "invalidates": ["list_environments"]
+            }
+        ]
+    }
+
+Params are substituted in "{param}" command tokens (dropped when the value is
+None) or appended as options through "flag", "true_flag" and "false_flag".
+Every tool returns the same {"success", "stdout", "stderr", "command"} dict.
+"""
+
+import os
+import time
+import json
+import asyncio
+import inspect
+from typing import Optional, Annotated, Any, Dict, List, Tuple
+
+from pydantic import Field
+from mcp.server.fastmcp import FastMCP
+
+PARAM_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+def cap_output(data: bytes, limit: int) -> str:
+    """Decode command output, keeping its end if it is over the limit."""
+    text = data.decode("utf-8", errors="replace")
+    if len(data) <= limit:
+        return text
+    tail = data[-limit:].decode("utf-8", errors="replace")
+    return f"... [{len(data) - limit} bytes truncated] ...\n{tail}"
+
+
+class CLIExecutor:
+    """Shared async subprocess executor with bounded concurrency and a result cache.
+
+    Read-only results are cached per argv for a TTL, and identical read-only calls
+    in flight at the same time share a single process.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        timeout: float = 60,
+        max_output_bytes: int = 64 * 1024,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.cache: Dict[Tuple[str, ...], Tuple[float, Dict[str, Any]]] = {}
+        self.in_flight: Dict[Tuple[str, ...], "asyncio.Task[Dict[str, Any]]"] = {}
+        self.stats = {"spawned": 0, "cache_hits": 0, "coalesced": 0}
+
+    def pool(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's running event loop
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphore
+
+    async def run(
+        self,
+        command: List[str],
+        timeout: Optional[float] = None,
+        cache_ttl: float = 0,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Run a command and return its result dict.
+
+        Args:
+            command: Program and arguments, run without a shell.
+            timeout: Seconds before the process is killed (executor default if None).
+            cache_ttl: Seconds a successful result is reused for the same command.
+                Only use it for commands without side effects.
+            env: Optional extra environment variables.
+        """
+        key = tuple(command)
+        if cache_ttl > 0:
+            cached = self.cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self.stats["cache_hits"] += 1
+                return dict(cached[1], cached=True)
+            if key in self.in_flight:
+                self.stats["coalesced"] += 1
+            else:
+                # Owned by no caller: one of them being cancelled leaves it running
+                # for the others, and the result is still cached
+                task = asyncio.create_task(
+                    self.spawn_shared(key, command, timeout, env, cache_ttl)
+                )
+                # Nobody may be waiting on it anymore, mark its exception retrieved
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self.in_flight[key] = task
+            return dict(await asyncio.shield(self.in_flight[key]))
+        return await self.spawn(command, timeout, env)
+
+    async def spawn_shared(
+        self,
+        key: Tuple[str, ...],
+        command: List[str],
+        timeout: Optional[float],
+        env: Optional[Dict[str, str]],
+        cache_ttl: float,
+    ) -> Dict[str, Any]:
+        """Run a read-only command for every caller waiting on it and cache its result."""
+        try:
+            result = await self.spawn(command, timeout, env)
+            if result["success"]:
+                self.cache[key] = (time.monotonic() + cache_ttl, result)
+            return result
+        finally:
+            del self.in_flight[key]
+
+    async def spawn(
+        self,
+        command: List[str],
+        timeout: Optional[float],
+        env: Optional[Dict[str, str]],
+    ) -> Dict[str, Any]:
+        timeout = timeout or self.timeout
+        display = " ".join(command)
+        async with self.pool():
+            self.stats["spawned"] += 1
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env={**os.environ, **env} if env else None,
+                )
+            except OSError as e:
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "stdout": "",
+                    "stderr": "",
+                    "command": display,
+                }
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                stdout, stderr = await process.communicate()
+                return {
+                    "success": False,
+                    "error": f"Command timed out after {timeout}s",
+                    "stdout": cap_output(stdout, self.max_output_bytes),
+                    "stderr": cap_output(stderr, self.max_output_bytes),
+                    "command": display,
+                }
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+
+        result = {
+            "success": process.returncode == 0,
+            "stdout": cap_output(stdout, self.max_output_bytes),
+            "stderr": cap_output(stderr, self.max_output_bytes),
+            "command": display,
+        }
+        if process.returncode != 0:
+            result["error"] = (
+                f"Command '{display}' returned non-zero exit status {process.returncode}."
+            )
+        return result
+
+    def invalidate(self, prefixes: List[List[str]]) -> None:
+        """Drop cached results of commands starting with any of the given prefixes."""
+        for key in list(self.cache):
+            if any(list(key[: len(prefix)]) == prefix for prefix in prefixes):
+                del self.cache[key]
+
+
+class CommandSpec:
+    """One CLI-backed tool."""
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.name: str = spec["name"]
+        self.description: str = spec.get("description", "")
+        self.command: List[str] = spec["command"]
+        self.params: Dict[str, Dict[str, Any]] = spec.get("params", {})
+        self.read_only: bool = spec.get("read_only", False)
+        self.cache_ttl: float = spec.get("cache_ttl", 0) if self.read_only else 0
+        self.invalidates: List[str] = spec.get("invalidates", [])
+        self.timeout: Optional[float] = spec.get("timeout")
+        self.enabled: bool = spec.get("enabled", True)
+        for name, param in self.params.items():
+            if param.get("type", "string") not in PARAM_TYPES:
+                raise ValueError(f"{self.name}: unsupported type for param {name}")
+
+    def static_prefix(self) -> List[str]:
+        """Leading command tokens without placeholders, used for cache invalidation."""
+        prefix = []
+        for token in self.command:
+            if "{" in token:
+                break
+            prefix.append(token)
+        return prefix
+
+    def build_argv(self, values: Dict[str, Any]) -> List[str]:
+        argv = []
+        for token in self.command:
+            if token.startswith("{") and token.endswith("}"):
+                value = values.get(token[1:-1])
+                if value is not None:
+                    argv.append(str(value))
+            else:
+                argv.append(token.format(**values) if "{" in token else token)
+        for name, param in self.params.items():
+            value = values.get(name)
+            if value is None:
+                continue
+            if param.get("type") == "boolean":
+                flag = param.get("true_flag") if value else param.get("false_flag")
+                if flag:
+                    argv.append(flag)
+            elif "flag" in param:
+                argv.extend([param["flag"], str(value)])
+        return argv
+
+    def signature(self) -> inspect.Signature:
+        """Keyword-only signature FastMCP turns into the tool's input schema."""
+        parameters = []
+        for name, param in self.params.items():
+            annotation = Annotated[
+                PARAM_TYPES[param.get("type", "string")],
+                Field(description=param.get("description", "")),
+            ]
+            default = (
+                inspect.Parameter.empty
+                if param.get("required")
+                else param.get("default")
+            )
+            parameters.append(
+                inspect.Parameter(
+                    name,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=annotation,
+                    default=default,
+                )
+            )
+        # Required params first, as Python signatures require
+        parameters.sort(key=lambda p: p.default is not inspect.Parameter.empty)
+        return inspect.Signature(parameters, return_annotation=dict)
+
+
+def load_specs(spec_path: str) -> Dict[str, Any]:
+    with open(spec_path, "r") as f:
+        return json.load(f)
+
+
+def register_commands(
+    mcp: FastMCP, tools: List[Dict[str, Any]], executor: CLIExecutor
+) -> List[CommandSpec]:
+    """Add one MCP tool per enabled command spec."""
+    specs = [CommandSpec(tool) for tool in tools]
+    by_name = {spec.name: spec for spec in specs}
+    for spec in specs:
+        if not spec.enabled:
+            continue
+        invalidated = [by_name[name].static_prefix() for name in spec.invalidates]
+        mcp.add_tool(
+            make_tool(spec, executor, invalidated),
+            name=spec.name,
+            description=spec.description,
+        )
+    return specs
+
+
+def make_tool(spec: CommandSpec, executor: CLIExecutor, invalidated: List[List[str]]):
+    async def tool(**values: Any) -> dict:
+        result = await executor.run(
+            spec.build_argv(values), timeout=spec.timeout, cache_ttl=spec.cache_ttl
+        )
+        if invalidated and result["success"]:
+            executor.invalidate(invalidated)
+        return result
+
+    tool.__name__ = spec.name
+    tool.__doc__ = spec.description
+    tool.__signature__ = spec.signature()
+    return tool
+
+
+def build_server(spec_path: str) -> FastMCP:
+    """Create a FastMCP server exposing every command of a spec file."""
+    config = load_specs(spec_path)
+    mcp = FastMCP(config["name"])
+    executor = CLIExecutor(
+        max_concurrency=config.get("max_concurrency", 4),
+        timeout=config.get("timeout", 60),
+        max_output_bytes=config.get("max_output_bytes", 64 * 1024),
+    )
+    register_commands(mcp, config["tools"], executor)
+    return mcp
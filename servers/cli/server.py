@@ -0,0 +1,8 @@
+import sys
+
+from cli_wrapper import build_server
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: server.py <spec.json>")
+    build_server(sys.argv[1]).run()
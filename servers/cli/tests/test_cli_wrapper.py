@@ -0,0 +1,25 @@
+import sys
+import asyncio
+
+from cli_wrapper import CLIExecutor
+
+SLOW_ECHO = [sys.executable, "-c", "import time; time.sleep(0.3); print('hi')"]
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_waiters():
+    async def scenario():
+        executor = CLIExecutor()
+        owner = asyncio.create_task(executor.run(SLOW_ECHO, cache_ttl=10))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(executor.run(SLOW_ECHO, cache_ttl=10))
+        await asyncio.sleep(0.05)
+        owner.cancel()
+        result = await waiter
+        cached = await executor.run(SLOW_ECHO, cache_ttl=10)
+        return owner.cancelled(), result, cached, executor.stats
+
+    cancelled, result, cached, stats = asyncio.run(scenario())
+    assert cancelled
+    assert result["success"] and result["stdout"].strip() == "hi"
+    assert cached["cached"]
+    assert stats == {"spawned": 1, "cache_hits": 1, "coalesced": 1}
@@ -0,0 +1,54 @@
+"""Per-path locks shared by the utils server and the clients.
+
+Both the server's write_file tool and the session overlays of clients/workspace.py
+take these locks, so they must agree on where the lock of a path lives. Lock files
+live outside the output directories so agents never see them.
+
+The utils and modal servers run as standalone scripts and vendor this module as
+servers/utils/locks.py and servers/modal/locks.py, the copies must stay identical.
+"""
+
+import os
+import time
+import fcntl
+import hashlib
+import tempfile
+import contextlib
+from typing import Iterator
+
+LOCK_DIR = os.environ.get(
+    "PYAGENTS_LOCK_DIR", os.path.join(tempfile.gettempdir(), "pyagents-locks")
+)
+LOCK_TIMEOUT = float(os.environ.get("PYAGENTS_LOCK_TIMEOUT", "30"))
+
+
+def lock_path(path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(LOCK_DIR, f"{digest}.lock")
+
+
+@contextlib.contextmanager
+def path_lock(path: str, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """Hold an exclusive lock on a path, across threads and processes.
+
+    Waiting polls the lock, so call it from a worker thread in async code.
+
+    Raises:
+        TimeoutError: If the lock could not be acquired within `timeout` seconds.
+    """
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    fd = os.open(lock_path(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for the lock on {path}")
+                time.sleep(0.01)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
@@ -0,0 +1,183 @@
+import os
+import json
+import hmac
+import asyncio
+import hashlib
+import tempfile
+from typing import Optional, Any, Dict, List
+
+import locks
+
+# Local record of what was last pushed per workspace (Modal profile) and environment,
+# values are only stored as salted hashes
+MANIFEST_PATH = os.environ.get(
+    "MODAL_SECRETS_MANIFEST",
+    os.path.join(os.path.expanduser("~"), ".modal", "pyagents_secrets_manifest.json"),
+)
+DEFAULT_ENV = "default"
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    manifest.setdefault("salt", os.urandom(16).hex())
+    manifest.setdefault("workspaces", {})
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any], path: str = MANIFEST_PATH) -> None:
+    """Write the manifest atomically so an interrupted sync never corrupts it."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def secret_hash(salt: str, keyvalues: Dict[str, Any]) -> str:
+    payload = json.dumps({k: str(v) for k, v in keyvalues.items()}, sort_keys=True)
+    return hmac.new(bytes.fromhex(salt), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def plan(
+    manifest: Dict[str, Any],
+    secrets: Dict[str, Dict[str, Any]],
+    profile: str,
+    env: str,
+) -> Dict[str, List[str]]:
+    """Compare the desired secrets of a workspace environment with the manifest."""
+    known = manifest["workspaces"].get(profile, {}).get(env, {})
+    result: Dict[str, List[str]] = {"added": [], "changed": [], "unchanged": []}
+    for name, keyvalues in sorted(secrets.items()):
+        if name not in known:
+            result["added"].append(name)
+        elif known[name] != secret_hash(manifest["salt"], keyvalues):
+            result["changed"].append(name)
+        else:
+            result["unchanged"].append(name)
+    # Secrets pushed before but absent from the desired set are reported, not deleted
+    result["not_in_request"] = sorted(set(known) - set(secrets))
+    return result
+
+
+async def push_secret(
+    executor: Any,
+    name: str,
+    keyvalues: Dict[str, Any],
+    env: Optional[str],
+    semaphore: asyncio.Semaphore,
+    timeout: Optional[float],
+) -> Dict[str, Any]:
+    """Create or overwrite one secret, passing values through a private temp file."""
+    async with semaphore:
+        fd, values_path = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({k: str(v) for k, v in keyvalues.items()}, f)
+            command = ["modal", "secret", "create", name, "--from-json", values_path]
+            if env:
+                command.extend(["-e", env])
+            command.append("--force")
+            result = await executor.run(command, timeout=timeout)
+            return {"name": name, **result}
+        finally:
+            os.unlink(values_path)
+
+
+async def active_profile(executor: Any) -> str:
+    """Name of the active Modal profile, which selects the workspace.
+
+    Shares the cached result of the current_profile tool, dropped by activate_profile.
+    """
+    result = await executor.run(["modal", "profile", "current"], cache_ttl=300)
+    profile = result["stdout"].strip() if result["success"] else ""
+    if not profile:
+        raise RuntimeError(
+            f"Could not determine the active Modal profile: {result.get('error')}"
+        )
+    return profile
+
+
+def record_pushes(
+    manifest_path: str,
+    profile: str,
+    env: str,
+    secrets: Dict[str, Dict[str, Any]],
+    results: List[Dict[str, Any]],
+) -> None:
+    """Add the successful pushes to the manifest, under its path lock.
+
+    The manifest is re-read under the lock so concurrent syncs do not drop each
+    other's updates.
+    """
+    with locks.path_lock(manifest_path):
+        manifest = load_manifest(manifest_path)
+        known = manifest["workspaces"].setdefault(profile, {}).setdefault(env, {})
+        for result in results:
+            if result["success"]:
+                known[result["name"]] = secret_hash(
+                    manifest["salt"], secrets[result["name"]]
+                )
+        save_manifest(manifest, manifest_path)
+
+
+async def sync(
+    executor: Any,
+    secrets: Dict[str, Dict[str, Any]],
+    env: Optional[str] = None,
+    max_concurrency: int = 4,
+    dry_run: bool = False,
+    force: bool = False,
+    timeout: Optional[float] = None,
+    manifest_path: str = MANIFEST_PATH,
+) -> Dict[str, Any]:
+    """Push only the added or changed secrets of an environment, concurrently.
+
+    Pushes run through the server's CLIExecutor (see servers/cli/cli_wrapper.py), so
+    its concurrency bound, timeout and output cap apply to them like to any other
+    modal call. `max_concurrency` further limits the pushes of this sync alone.
+    With `force`, every secret is pushed whatever the manifest says.
+    """
+    if max_concurrency < 1:
+        return {"success": False, "error": "max_concurrency must be at least 1"}
+    profile = await active_profile(executor)
+    manifest = load_manifest(manifest_path)
+    env_key = env or DEFAULT_ENV
+    changes = plan(manifest, secrets, profile, env_key)
+    to_push = sorted(secrets) if force else changes["added"] + changes["changed"]
+    if dry_run or not to_push:
+        return {
+            "success": True,
+            "dry_run": dry_run,
+            "profile": profile,
+            **changes,
+            "results": [],
+        }
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(
+        *(
+            push_secret(executor, name, secrets[name], env, semaphore, timeout)
+            for name in to_push
+        )
+    )
+
+    # Waiting for the lock polls, keep it off the event loop
+    await asyncio.to_thread(
+        record_pushes, manifest_path, profile, env_key, secrets, results
+    )
+
+    return {
+        "success": all(result["success"] for result in results),
+        "dry_run": False,
+        "profile": profile,
+        **changes,
+        "results": results,
+    }
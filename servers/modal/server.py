@@ -1,10 +1,46 @@
+import os
+import sys
+
 from mcp.server.fastmcp import FastMCP
 
+# Shared CLI wrapper framework, see servers/cli
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cli")
+)
+from cli_wrapper import CLIExecutor, load_specs, register_commands
+
+import validation
+import secret_sync
 
 mcp = FastMCP("modal")
 
+# Plain CLI tools (environments, profiles, ...) are declared in this spec
+CLI_TOOLS = load_specs(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli_tools.json")
+)
+DEPLOY_TIMEOUT = 600
+
+# Every modal CLI call of this server goes through this executor
+executor = CLIExecutor(
+    max_concurrency=CLI_TOOLS["max_concurrency"],
+    timeout=CLI_TOOLS["timeout"],
+    max_output_bytes=CLI_TOOLS["max_output_bytes"],
+)
+
+
+@mcp.tool()
+async def validate_app(app_file_path: str) -> dict:
+    """
+    Check a Modal application locally without deploying it: syntax, top-level imports, the modal.App definition and decorators.
+    Returns a summary of the app's functions and web endpoints. This is fast, use it after every edit.
 
-import subprocess
+    Args:
+        app_file_path: Absolute path to a Python file with an app to validate.
+    """
+    try:
+        return validation.validate_app_file(app_file_path)
+    except OSError as e:
+        return {"valid": False, "errors": [f"Error reading file: {str(e)}"]}
 
 
 @mcp.tool()
@@ -12,14 +48,17 @@ async def deploy(
     app_file_path: str,
     name: str = None,
     env: str = None,
+    skip_validation: bool = False,
 ) -> dict:
     """
     Deploy a Modal application and persist it to the cloud.
+    The app is validated locally first and is not deployed if validation fails.
 
     Args:
         app_file_path: Absolute path to a Python file with an app to deploy.
         name: Optional name of the deployment.
         env: Optional environment to interact with.
+        skip_validation: Deploy even if the local validation reports errors.
     """
 
     command = ["modal", "deploy", app_file_path]
@@ -28,22 +67,17 @@ async def deploy(
     if env:
         command.extend(["-e", env])
 
-    try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return {
-            "success": True,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "command": " ".join(command),
-        }
-    except subprocess.CalledProcessError as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "stdout": e.stdout,
-            "stderr": e.stderr,
-            "command": " ".join(command),
-        }
+    if not skip_validation:
+        report = await validate_app(app_file_path)
+        if not report["valid"]:
+            return {
+                "success": False,
+                "error": "Local validation failed, the app was not deployed",
+                "validation": report,
+                "command": " ".join(command),
+            }
+
+    return await executor.run(command, timeout=DEPLOY_TIMEOUT)
 
 
 @mcp.tool()
@@ -73,255 +107,44 @@ async def create_secret(
     if force:
         command.append("--force")
 
+    return await executor.run(command)
+
+
+@mcp.tool()
+async def sync_secrets(
+    secrets: dict,
+    env: str = None,
+    dry_run: bool = False,
+    force: bool = False,
+    max_concurrency: int = 4,
+) -> dict:
+    """
+    Make Modal secrets match a desired set. Only secrets that are new or whose values changed since the last sync to the active profile's workspace are pushed, concurrently.
+    Prefer this over create_secret when the app needs several secrets or when re-running.
+
+    Arguments:
+        secrets: Mapping of secret name to a dictionary of key-value pairs, e.g. {"openai": {"OPENAI_API_KEY": "..."}}. [required]
+
+    Options:
+        env: Environment to interact with. Default is 'default'.
+        dry_run: Only report which secrets would be pushed.
+        force: Push every secret, even those recorded as unchanged (e.g. if they were changed or deleted outside this tool).
+        max_concurrency: Maximum number of secrets pushed at the same time.
+    """
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return {
-            "success": True,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "command": " ".join(command),
-        }
-    except subprocess.CalledProcessError as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "stdout": e.stdout,
-            "stderr": e.stderr,
-            "command": " ".join(command),
-        }
-
-
-# @mcp.tool()
-# async def serve(
-#     app_ref: str,
-#     env: str = None,
-#     timeout: float = 30.0,
-# ) -> dict:
-#     """
-#     Serve a Modal application and enable hot-reloading of code. Use this for development and iteration.
-
-#     Arguments:
-#         app_ref: Path to a Python file with an app. [required]
-
-#     Options:
-#         --timeout FLOAT: Timeout for the operation. Default is 30.0 seconds.
-#         -e, --env TEXT: Environment to interact with. Default is 'default'.
-#     """
-
-#     command = ["modal", "serve", app_ref]
-
-#     if env:
-#         command.extend(["-e", env])
-
-#     if timeout:
-#         command.extend(["--timeout", str(timeout)])
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
-
-
-# @mcp.tool()
-# async def set_token(
-#     token_id: str = None,
-#     token_secret: str = None,
-#     profile: str = None,
-#     activate: bool = True,
-#     verify: bool = True,
-# ) -> dict:
-#     """
-#     Set account credentials for connecting to Modal. Use this to connect to modal with user modal credentials.
-
-#     Options:
-#         token_id: Account token ID.
-#         token_secret: Account token secret.
-#         profile: Modal profile to set credentials for. Uses workspace name if unspecified.
-#         activate: Activate the profile containing this token after creation. Default is True.
-#         verify: Make a test request to verify the new credentials. Default is True.
-#     """
-#     command = ["modal", "token", "set"]
-
-#     if token_id:
-#         command.extend(["--token-id", token_id])
-
-#     if token_secret:
-#         command.extend(["--token-secret", token_secret])
-
-#     if profile:
-#         command.extend(["--profile", profile])
-
-#     if not activate:
-#         command.append("--no-activate")
-
-#     if not verify:
-#         command.append("--no-verify")
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
-
-
-# @mcp.tool()
-# async def list_environments() -> dict:
-#     """
-#     List all environments in the current workspace.
-#     """
-#     command = ["modal", "environment", "list"]
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
-
-
-# @mcp.tool()
-# async def create_environment(name: str) -> dict:
-#     """
-#     Create a new environment in the current workspace.
-
-#     Arguments:
-#         name: Name of the new environment. Must be unique and case-sensitive.
-#     """
-#     command = ["modal", "environment", "create", name]
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
-
-
-# @mcp.tool()
-# async def activate_profile(profile: str) -> dict:
-#     """
-#     Change the active Modal profile. Use this to switch between workspaces.
-
-#     Arguments:
-#         profile: Modal profile to activate.
-#     """
-#     command = ["modal", "profile", "activate", profile]
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
-
-
-# @mcp.tool()
-# async def current_profile() -> dict:
-#     """
-#     Print the currently active Modal profile.
-#     """
-#     command = ["modal", "profile", "current"]
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
-
-
-# @mcp.tool()
-# async def list_profiles(json_output: bool = False) -> dict:
-#     """
-#     Show all Modal profiles and highlight the active one.
-
-#     Options:
-#         json_output: Whether to output as JSON.
-#     """
-#     command = ["modal", "profile", "list"]
-
-#     if json_output:
-#         command.append("--json")
-
-#     try:
-#         result = subprocess.run(command, capture_output=True, text=True, check=True)
-#         return {
-#             "success": True,
-#             "stdout": result.stdout,
-#             "stderr": result.stderr,
-#             "command": " ".join(command),
-#         }
-#     except subprocess.CalledProcessError as e:
-#         return {
-#             "success": False,
-#             "error": str(e),
-#             "stdout": e.stdout,
-#             "stderr": e.stderr,
-#             "command": " ".join(command),
-#         }
+        return await secret_sync.sync(
+            executor,
+            secrets,
+            env=env,
+            max_concurrency=max_concurrency,
+            dry_run=dry_run,
+            force=force,
+        )
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+register_commands(mcp, CLI_TOOLS["tools"], executor)
 
 
 if __name__ == "__main__":
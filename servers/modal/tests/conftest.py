@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Server modules are imported as top-level modules, like server.py does
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, os.path.join(SERVER_DIR, "..", "cli"))
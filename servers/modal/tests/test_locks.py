@@ -0,0 +1,12 @@
+import os
+
+import locks
+
+CLIENT_LOCKS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "clients", "locks.py"
+)
+
+
+def test_vendored_locks_match_the_client_module():
+    with open(locks.__file__, "r") as vendored, open(CLIENT_LOCKS, "r") as client:
+        assert vendored.read() == client.read()
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+
+import secret_sync
+from cli_wrapper import CLIExecutor
+
+# Prints $STUB_PROFILE as the active profile, records each push with its values and
+# fails for secrets named "broken"
+STUB_MODAL = """#!{python}
+import os, sys, json
+argv = sys.argv[1:]
+if argv[:2] == ["profile", "current"]:
+    print(os.environ.get("STUB_PROFILE", "main"))
+    sys.exit(0)
+values = json.load(open(argv[argv.index("--from-json") + 1]))
+with open({log!r}, "a") as f:
+    f.write(json.dumps({{"argv": argv, "values": values}}) + "\\n")
+sys.exit(1 if argv[2] == "broken" else 0)
+"""
+
+
+@pytest.fixture
+def stub_modal(tmp_path, monkeypatch):
+    """Put a fake `modal` first on PATH and return a function listing its calls."""
+    log = tmp_path / "calls.jsonl"
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    modal = bin_dir / "modal"
+    modal.write_text(STUB_MODAL.format(python=sys.executable, log=str(log)))
+    modal.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def calls():
+        if not log.exists():
+            return []
+        calls = [json.loads(line) for line in log.read_text().splitlines()]
+        log.unlink()
+        return calls
+
+    return calls
+
+
+def sync(manifest_path, secrets, executor=None, **kwargs):
+    return asyncio.run(
+        secret_sync.sync(
+            executor or CLIExecutor(),
+            secrets,
+            manifest_path=str(manifest_path),
+            **kwargs,
+        )
+    )
+
+
+def test_only_added_and_changed_secrets_are_pushed(tmp_path, stub_modal):
+    manifest_path = tmp_path / "manifest.json"
+    secrets = {"openai": {"KEY": "a"}, "db": {"URL": "b"}}
+
+    result = sync(manifest_path, secrets, env="dev")
+    assert result["success"]
+    assert result["added"] == ["db", "openai"]
+    calls = stub_modal()
+    assert sorted(call["argv"][2] for call in calls) == ["db", "openai"]
+    assert calls[0]["argv"][-3:] == ["-e", "dev", "--force"]
+    assert {call["argv"][2]: call["values"] for call in calls} == secrets
+
+    manifest = json.loads(manifest_path.read_text())
+    assert sorted(manifest["workspaces"]["main"]["dev"]) == ["db", "openai"]
+    # Values are only stored as salted hashes
+    assert "a" not in manifest["workspaces"]["main"]["dev"].values()
+
+    result = sync(manifest_path, secrets, env="dev")
+    assert result["unchanged"] == ["db", "openai"]
+    assert stub_modal() == []
+
+    result = sync(manifest_path, {**secrets, "openai": {"KEY": "c"}}, env="dev")
+    assert result["changed"] == ["openai"]
+    assert result["unchanged"] == ["db"]
+    assert [call["argv"][2] for call in stub_modal()] == ["openai"]
+
+    # Environments are tracked separately
+    result = sync(manifest_path, secrets, env="prod")
+    assert result["added"] == ["db", "openai"]
+
+
+def test_failed_pushes_are_not_recorded(tmp_path, stub_modal):
+    manifest_path = tmp_path / "manifest.json"
+    result = sync(manifest_path, {"broken": {"K": "v"}, "ok": {"K": "v"}})
+    assert not result["success"]
+    assert {r["name"]: r["success"] for r in result["results"]} == {
+        "broken": False,
+        "ok": True,
+    }
+    manifest = json.loads(manifest_path.read_text())
+    assert list(manifest["workspaces"]["main"]["default"]) == ["ok"]
+
+    result = sync(manifest_path, {"broken": {"K": "v"}, "ok": {"K": "v"}})
+    assert result["added"] == ["broken"]
+
+
+def test_dry_run_pushes_nothing(tmp_path, stub_modal):
+    manifest_path = tmp_path / "manifest.json"
+    result = sync(manifest_path, {"openai": {"KEY": "a"}}, dry_run=True)
+    assert result["added"] == ["openai"]
+    assert stub_modal() == []
+    assert not manifest_path.exists()
+
+
+@pytest.mark.parametrize("max_concurrency", [0, -1])
+def test_invalid_concurrency_is_rejected(tmp_path, stub_modal, max_concurrency):
+    result = sync(
+        tmp_path / "manifest.json",
+        {"openai": {"KEY": "a"}},
+        max_concurrency=max_concurrency,
+    )
+    assert result == {
+        "success": False,
+        "error": "max_concurrency must be at least 1",
+    }
+    assert stub_modal() == []
+
+
+def test_pushes_go_through_the_executor(tmp_path, stub_modal):
+    executor = CLIExecutor(max_concurrency=1)
+    result = sync(
+        tmp_path / "manifest.json",
+        {"a": {"K": "v"}, "b": {"K": "v"}},
+        executor=executor,
+    )
+    assert result["success"]
+    # One call for the active profile, one per push
+    assert executor.stats["spawned"] == 3
+    assert [r["command"].split()[:4] for r in result["results"]] == [
+        ["modal", "secret", "create", "a"],
+        ["modal", "secret", "create", "b"],
+    ]
+
+
+def test_secrets_are_tracked_per_profile(tmp_path, stub_modal, monkeypatch):
+    manifest_path = tmp_path / "manifest.json"
+    secrets = {"openai": {"KEY": "a"}}
+    assert sync(manifest_path, secrets)["added"] == ["openai"]
+    stub_modal()
+
+    monkeypatch.setenv("STUB_PROFILE", "other-workspace")
+    result = sync(manifest_path, secrets)
+    assert result["profile"] == "other-workspace"
+    assert result["added"] == ["openai"]
+    assert [call["argv"][2] for call in stub_modal()] == ["openai"]
+
+
+def test_force_pushes_unchanged_secrets(tmp_path, stub_modal):
+    manifest_path = tmp_path / "manifest.json"
+    secrets = {"openai": {"KEY": "a"}, "db": {"URL": "b"}}
+    sync(manifest_path, secrets)
+    stub_modal()
+
+    result = sync(manifest_path, secrets, force=True)
+    assert result["unchanged"] == ["db", "openai"]
+    assert sorted(call["argv"][2] for call in stub_modal()) == ["db", "openai"]
+
+
+def test_concurrent_syncs_keep_each_others_updates(tmp_path, stub_modal):
+    manifest_path = tmp_path / "manifest.json"
+
+    async def both():
+        executor = CLIExecutor()
+        await asyncio.gather(
+            *(
+                secret_sync.sync(
+                    executor, {name: {"K": "v"}}, manifest_path=str(manifest_path)
+                )
+                for name in ("a", "b", "c", "d")
+            )
+        )
+
+    asyncio.run(both())
+    manifest = json.loads(manifest_path.read_text())
+    assert sorted(manifest["workspaces"]["main"]["default"]) == ["a", "b", "c", "d"]
@@ -0,0 +1,46 @@
+import validation
+
+HEADER = "import modal\n\n"
+
+
+def validate(tmp_path, source):
+    # A sibling module resolves the import without modal installed
+    (tmp_path / "modal.py").write_text("")
+    path = tmp_path / "app.py"
+    path.write_text(source)
+    return validation.validate_app_file(str(path))
+
+
+def test_annotated_app_assignment_is_recognized(tmp_path):
+    report = validate(
+        tmp_path,
+        HEADER
+        + 'app: modal.App = modal.App("x")\n\n\n@app.function()\ndef f():\n    pass\n',
+    )
+    assert report["valid"]
+    assert report["errors"] == [] and report["warnings"] == []
+    assert report["apps"] == {"app": "x"}
+    assert [function["name"] for function in report["functions"]] == ["f"]
+
+
+def test_heuristic_findings_do_not_invalidate_the_app(tmp_path):
+    report = validate(
+        tmp_path,
+        HEADER
+        + "import not_installed_anywhere\n\napp = make_app()\n\n\n"
+        + "@app.function()\ndef f():\n    pass\n",
+    )
+    assert report["valid"]
+    assert len(report["warnings"]) == 3
+
+
+def test_certain_problems_are_errors(tmp_path):
+    report = validate(
+        tmp_path,
+        HEADER + 'app = modal.App("x")\n\n\n@app.cls()\ndef f():\n    pass\n',
+    )
+    assert not report["valid"]
+    assert report["errors"] == ["line 7: @app.cls must decorate a class"]
+
+    report = validate(tmp_path, HEADER + "def f(:\n")
+    assert not report["valid"]
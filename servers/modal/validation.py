@@ -0,0 +1,327 @@
+import os
+import ast
+import sys
+import hashlib
+import importlib
+import importlib.util
+from typing import Optional, Any, Dict, List, Set
+
+# Decorators exposing a function over HTTP
+ENDPOINT_DECORATORS = {
+    "fastapi_endpoint",
+    "web_endpoint",
+    "asgi_app",
+    "wsgi_app",
+    "web_server",
+}
+DEPRECATED_DECORATORS = {"web_endpoint": "fastapi_endpoint"}
+# Decorators that must sit under an app.function/app.cls decorator
+FUNCTION_MODIFIERS = ENDPOINT_DECORATORS | {"batched", "concurrent"}
+# App decorators and the kind of object they define
+APP_DECORATORS = {
+    "function": "function",
+    "cls": "cls",
+    "local_entrypoint": "local_entrypoint",
+}
+CLASS_METHOD_DECORATORS = {"method", "enter", "exit"} | ENDPOINT_DECORATORS
+
+# Parsed ASTs (or syntax errors) by file hash, kept for the server lifetime
+CACHE: Dict[str, Any] = {}
+
+
+def dotted_name(node: ast.AST) -> Optional[str]:
+    """Return "a.b.c" for Name/Attribute chains (calls are unwrapped)."""
+    if isinstance(node, ast.Call):
+        node = node.func
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def literal(node: Optional[ast.AST]) -> Any:
+    """Best effort static value of a decorator argument, for the summary."""
+    if node is None:
+        return None
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return ast.unparse(node)
+
+
+def call_kwargs(node: ast.AST) -> Dict[str, ast.AST]:
+    if not isinstance(node, ast.Call):
+        return {}
+    return {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+
+
+class AppChecker:
+    """Static checks on the AST of a Modal application file.
+
+    Only certain problems (misused decorators of a known App) are errors, which block
+    a deploy. Findings of heuristics that can be wrong about a valid app, such as an
+    import that does not resolve in the server's environment or an App created in a
+    way the checker does not follow, are warnings.
+    """
+
+    def __init__(self, tree: ast.Module, app_dir: str) -> None:
+        self.tree = tree
+        self.app_dir = app_dir
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+        # Local names bound to the modal module and to modal.App
+        self.modal_names: Set[str] = set()
+        self.app_class_names: Set[str] = set()
+        self.apps: Dict[str, Optional[str]] = {}
+        self.functions: List[Dict[str, Any]] = []
+
+    def check(self) -> None:
+        self.check_imports()
+        self.find_apps()
+        for node in self.tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.check_definition(node)
+
+    def module_available(self, name: str) -> bool:
+        top_level = name.split(".")[0]
+        if top_level in sys.builtin_module_names:
+            return True
+        if os.path.exists(
+            os.path.join(self.app_dir, top_level + ".py")
+        ) or os.path.isdir(os.path.join(self.app_dir, top_level)):
+            return True
+        try:
+            return importlib.util.find_spec(top_level) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def check_imports(self) -> None:
+        """Top-level imports run locally at deploy time and must resolve here.
+
+        Imports inside functions or `with image.imports():` blocks only run in the
+        container and are not checked.
+        """
+        for node in self.tree.body:
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+                for alias in node.names:
+                    if alias.name == "modal":
+                        self.modal_names.add(alias.asname or "modal")
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+                if node.module == "modal":
+                    for alias in node.names:
+                        if alias.name == "App":
+                            self.app_class_names.add(alias.asname or "App")
+            else:
+                continue
+            for name in names:
+                if not self.module_available(name):
+                    # The modal CLI may run with other packages than this server
+                    self.warnings.append(
+                        f"line {node.lineno}: module '{name}' is imported at the top level but is not "
+                        "installed locally; import it inside the function or a `with image.imports():` block"
+                    )
+        if not self.modal_names and not self.app_class_names:
+            self.warnings.append("modal is never imported")
+
+    def is_app_constructor(self, node: ast.AST) -> bool:
+        name = dotted_name(node) if isinstance(node, ast.Call) else None
+        if name is None:
+            return False
+        return name in self.app_class_names or any(
+            name in (f"{modal}.App", f"{modal}.Stub") for modal in self.modal_names
+        )
+
+    def find_apps(self) -> None:
+        for node in self.tree.body:
+            if isinstance(node, ast.Assign):
+                targets = node.targets
+            elif isinstance(node, ast.AnnAssign) and node.value is not None:
+                # app: modal.App = modal.App(...)
+                targets = [node.target]
+            else:
+                continue
+            if not self.is_app_constructor(node.value):
+                continue
+            call = node.value
+            name = (
+                literal(call.args[0])
+                if call.args
+                else literal(call_kwargs(call).get("name"))
+            )
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    self.apps[target.id] = name
+            if dotted_name(call).endswith("Stub"):
+                self.warnings.append(
+                    f"line {node.lineno}: modal.Stub is deprecated, use modal.App"
+                )
+            if not name:
+                self.warnings.append(
+                    f"line {node.lineno}: the App has no name, pass one to modal.App() or use --name when deploying"
+                )
+        if not self.apps:
+            self.warnings.append(
+                "no `app = modal.App(...)` found at the top level of the file"
+            )
+
+    def split_decorator(self, decorator: ast.AST) -> Optional[tuple]:
+        """Classify a decorator as ("app", app name, attr) or ("modal", None, attr)."""
+        name = dotted_name(decorator)
+        if name is None or "." not in name:
+            return None
+        owner, attr = name.rsplit(".", 1)
+        if owner in self.modal_names:
+            return ("modal", None, attr)
+        return ("app", owner, attr)
+
+    def check_definition(self, node: ast.AST) -> None:
+        decorators = [self.split_decorator(d) for d in node.decorator_list]
+        app_decorators = [
+            (d, raw)
+            for d, raw in zip(decorators, node.decorator_list)
+            if d and d[0] == "app" and d[2] in APP_DECORATORS
+        ]
+        modifiers = [
+            d[2]
+            for d in decorators
+            if d and d[0] == "modal" and d[2] in FUNCTION_MODIFIERS
+        ]
+
+        for decorator in decorators:
+            if decorator and decorator[2] in DEPRECATED_DECORATORS:
+                self.warnings.append(
+                    f"line {node.lineno}: @modal.{decorator[2]} is deprecated, use @modal.{DEPRECATED_DECORATORS[decorator[2]]}"
+                )
+
+        if not app_decorators:
+            if modifiers:
+                self.errors.append(
+                    f"line {node.lineno}: {node.name} uses @modal.{modifiers[0]} without an @app.function() decorator"
+                )
+            return
+
+        (_, owner, attr), raw = app_decorators[0]
+        if owner not in self.apps:
+            # May still be an App the checker did not recognize
+            self.warnings.append(
+                f"line {node.lineno}: {node.name} is decorated with @{owner}.{attr} but {owner} is not a recognized modal.App"
+            )
+            return
+        kind = APP_DECORATORS[attr]
+        if kind == "cls" and not isinstance(node, ast.ClassDef):
+            self.errors.append(
+                f"line {node.lineno}: @{owner}.cls must decorate a class"
+            )
+        if kind != "cls" and isinstance(node, ast.ClassDef):
+            self.errors.append(
+                f"line {node.lineno}: use @{owner}.cls to decorate class {node.name}"
+            )
+        if node.decorator_list.index(raw) != 0 and kind != "local_entrypoint":
+            self.errors.append(
+                f"line {node.lineno}: @{owner}.{attr} must be the outermost decorator of {node.name}"
+            )
+
+        kwargs = call_kwargs(raw)
+        summary: Dict[str, Any] = {"name": node.name, "kind": kind, "line": node.lineno}
+        for key in ("image", "gpu", "schedule", "secrets", "timeout"):
+            if key in kwargs:
+                summary[key] = literal(kwargs[key])
+        endpoints = [
+            self.endpoint_summary(node.name, d, raw)
+            for d, raw in zip(decorators, node.decorator_list)
+            if d and d[2] in ENDPOINT_DECORATORS
+        ]
+        if isinstance(node, ast.ClassDef):
+            summary["methods"] = self.check_class_methods(node, endpoints)
+        if endpoints:
+            summary["endpoints"] = endpoints
+        self.functions.append(summary)
+
+    def endpoint_summary(
+        self, name: str, decorator: tuple, raw: ast.AST
+    ) -> Dict[str, Any]:
+        kwargs = call_kwargs(raw)
+        endpoint = {"function": name, "type": decorator[2]}
+        if decorator[2] in ("fastapi_endpoint", "web_endpoint"):
+            endpoint["method"] = literal(kwargs.get("method")) or "GET"
+        if "label" in kwargs:
+            endpoint["label"] = literal(kwargs["label"])
+        return endpoint
+
+    def check_class_methods(
+        self, node: ast.ClassDef, endpoints: List[Dict[str, Any]]
+    ) -> List[str]:
+        methods = []
+        for item in node.body:
+            if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            for raw in item.decorator_list:
+                decorator = self.split_decorator(raw)
+                if not decorator or decorator[0] != "modal":
+                    continue
+                if decorator[2] in CLASS_METHOD_DECORATORS:
+                    methods.append(item.name)
+                if decorator[2] in ENDPOINT_DECORATORS:
+                    endpoints.append(
+                        self.endpoint_summary(
+                            f"{node.name}.{item.name}", decorator, raw
+                        )
+                    )
+        return methods
+
+
+def parse_source(source: str, app_file_path: str) -> Any:
+    """Parse an app file, returning its AST or the SyntaxError it raises."""
+    try:
+        return ast.parse(source, filename=app_file_path)
+    except SyntaxError as e:
+        return e
+
+
+def check_parsed(parsed: Any, app_file_path: str) -> Dict[str, Any]:
+    if isinstance(parsed, SyntaxError):
+        return {
+            "valid": False,
+            "errors": [
+                f"line {parsed.lineno}, column {parsed.offset}: syntax error: {parsed.msg}"
+            ],
+            "warnings": [],
+            "apps": {},
+            "functions": [],
+        }
+    # Packages may have been installed since the last check
+    importlib.invalidate_caches()
+    checker = AppChecker(parsed, os.path.dirname(os.path.abspath(app_file_path)))
+    checker.check()
+    return {
+        "valid": not checker.errors,
+        "errors": checker.errors,
+        "warnings": checker.warnings,
+        "apps": checker.apps,
+        "functions": checker.functions,
+    }
+
+
+def validate_source(source: str, app_file_path: str) -> Dict[str, Any]:
+    """Validate the source of a Modal app without importing or running it."""
+    return check_parsed(parse_source(source, app_file_path), app_file_path)
+
+
+def validate_app_file(app_file_path: str) -> Dict[str, Any]:
+    """Validate a Modal app file, reusing its parsed AST if the file is unchanged.
+
+    Only parsing is cached: whether imports resolve depends on sibling files and
+    installed packages, so the checks run again on every call.
+    """
+    with open(app_file_path, "rb") as f:
+        data = f.read()
+    key = hashlib.sha256(data).hexdigest()
+    if key not in CACHE:
+        CACHE[key] = parse_source(data.decode("utf-8", errors="replace"), app_file_path)
+    return check_parsed(CACHE[key], app_file_path)
@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Budget of the in-memory read cache, least recently used files are evicted first
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+MAX_FILE_BYTES = 1024 * 1024
+
+
+class FileCache:
+    """LRU cache of text file contents, validated against mtime and size on every read."""
+
+    def __init__(
+        self, max_bytes: int = MAX_CACHE_BYTES, max_file_bytes: int = MAX_FILE_BYTES
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.entries: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> Optional[str]:
+        """Return the cached content if the file did not change since it was cached."""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+        self.misses += 1
+        return None
+
+    def read(self, path: str) -> str:
+        """Read a file through the cache."""
+        content = self.get(path)
+        if content is not None:
+            return content
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with open(path, "r") as f:
+            content = f.read()
+        self.put(path, stat, content)
+        return content
+
+    def put(self, path: str, stat: os.stat_result, content: str) -> None:
+        if stat.st_size > self.max_file_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old:
+                self.size -= old[1]
+            self.entries[path] = (stat.st_mtime_ns, stat.st_size, content)
+            self.size += stat.st_size
+            while self.size > self.max_bytes and self.entries:
+                _, (_, size, _) = self.entries.popitem(last=False)
+                self.size -= size
+
+    def invalidate(self, path: str) -> None:
+        with self.lock:
+            old = self.entries.pop(os.path.abspath(path), None)
+            if old:
+                self.size -= old[1]
+
+
+# Shared by every call of the server process
+CACHE = FileCache()
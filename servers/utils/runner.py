@@ -0,0 +1,281 @@
+import os
+import shlex
+import signal
+import asyncio
+import itertools
+from typing import Optional, Dict, List, Union
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, timeouts still apply
+    resource = None
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# Limits can be tuned through the "env" section of the server config.
+# Only the starting directory of commands is restricted to RUN_ROOT: commands run
+# with the server's user and can read or write any file it can. This is not a sandbox,
+# so the command tools are only registered when explicitly enabled.
+ENABLED = os.environ.get("UTILS_ENABLE_COMMANDS") == "1"
+RUN_ROOT = os.path.realpath(os.environ.get("UTILS_RUN_ROOT", os.getcwd()))
+MAX_CONCURRENCY = env_int("UTILS_RUN_MAX_CONCURRENCY", 4)
+CPU_SECONDS = env_int("UTILS_RUN_CPU_SECONDS", 120)
+MEMORY_MB = env_int("UTILS_RUN_MEMORY_MB", 2048)
+MAX_OUTPUT_BYTES = env_int("UTILS_RUN_MAX_OUTPUT_BYTES", 64 * 1024)
+MAX_FINISHED_JOBS = 32
+
+# Inherited variables passed to commands, everything else is dropped
+ENV_ALLOWLIST = {
+    "PATH",
+    "HOME",
+    "USER",
+    "LANG",
+    "LC_ALL",
+    "TERM",
+    "TMPDIR",
+    "VIRTUAL_ENV",
+    "PYTHONPATH",
+    *filter(None, os.environ.get("UTILS_RUN_ENV_ALLOWLIST", "").split(",")),
+}
+# Variables that could inject code into every process, rejected even if passed explicitly
+BLOCKED_ENV_PREFIXES = ("LD_", "DYLD_")
+
+
+class CommandError(Exception):
+    """Raised when a command is refused (working directory, environment, empty command)."""
+
+
+class OutputBuffer:
+    """Capped output capture keeping the head and, above all, the tail of the stream.
+
+    Bytes are addressed by their absolute offset in the stream so background jobs can
+    be polled incrementally even after older output was dropped.
+    """
+
+    def __init__(self, limit: int = MAX_OUTPUT_BYTES) -> None:
+        self.head_limit = limit // 4
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        if len(self.head) < self.head_limit:
+            taken = data[: self.head_limit - len(self.head)]
+            self.head += taken
+            self.total += len(taken)
+            data = data[len(taken) :]
+        self.tail += data
+        self.total += len(data)
+        if len(self.tail) > self.tail_limit:
+            del self.tail[: len(self.tail) - self.tail_limit]
+
+    @property
+    def tail_start(self) -> int:
+        return self.total - len(self.tail)
+
+    def read(self, offset: int = 0) -> str:
+        """Return the output from `offset`, marking any dropped range."""
+        parts = []
+        if offset < len(self.head):
+            parts.append(self.head[offset:].decode("utf-8", errors="replace"))
+            offset = len(self.head)
+        if offset < self.tail_start:
+            parts.append(f"\n... [{self.tail_start - offset} bytes truncated] ...\n")
+            offset = self.tail_start
+        parts.append(
+            self.tail[offset - self.tail_start :].decode("utf-8", errors="replace")
+        )
+        return "".join(parts)
+
+
+class Job:
+    def __init__(self, job_id: str, argv: List[str], cwd: str) -> None:
+        self.job_id = job_id
+        self.argv = argv
+        self.cwd = cwd
+        self.env: Dict[str, str] = {}
+        self.output = OutputBuffer()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.status = "queued"
+        self.returncode: Optional[int] = None
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    def describe(self) -> str:
+        if self.status == "finished":
+            return f"job {self.job_id} finished with exit code {self.returncode}"
+        return f"job {self.job_id} {self.status}"
+
+
+def resolve_cwd(cwd: Optional[str]) -> str:
+    """Resolve the working directory, refusing anything outside RUN_ROOT."""
+    path = os.path.realpath(os.path.join(RUN_ROOT, cwd) if cwd else RUN_ROOT)
+    if os.path.commonpath([path, RUN_ROOT]) != RUN_ROOT:
+        raise CommandError(f"working directory {cwd} is outside {RUN_ROOT}")
+    if not os.path.isdir(path):
+        raise CommandError(f"working directory {cwd} does not exist")
+    return path
+
+
+def build_env(extra: Optional[Dict[str, str]]) -> Dict[str, str]:
+    env = {key: value for key, value in os.environ.items() if key in ENV_ALLOWLIST}
+    for key, value in (extra or {}).items():
+        if key.startswith(BLOCKED_ENV_PREFIXES):
+            raise CommandError(f"environment variable {key} is not allowed")
+        env[key] = str(value)
+    return env
+
+
+def apply_limits(pid: int) -> None:
+    """Set the resource limits of a spawned command.
+
+    Applied from the parent with prlimit right after spawning: a preexec_fn is not
+    safe in a server that also runs work in threads.
+    """
+    if resource is None or not hasattr(resource, "prlimit"):
+        return
+    memory = MEMORY_MB * 1024 * 1024
+    try:
+        resource.prlimit(pid, resource.RLIMIT_CPU, (CPU_SECONDS, CPU_SECONDS))
+        resource.prlimit(pid, resource.RLIMIT_AS, (memory, memory))
+        resource.prlimit(pid, resource.RLIMIT_CORE, (0, 0))
+    except ProcessLookupError:
+        # Already exited
+        pass
+
+
+def parse_command(command: Union[str, List[str]]) -> List[str]:
+    argv = (
+        shlex.split(command) if isinstance(command, str) else [str(a) for a in command]
+    )
+    if not argv:
+        raise CommandError("empty command")
+    return argv
+
+
+class Runner:
+    """Runs commands on a bounded pool, in the foreground or as jobs."""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.jobs: Dict[str, Job] = {}
+        self.counter = itertools.count(1)
+
+    def pool(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's running event loop
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphore
+
+    def create_job(
+        self,
+        command: Union[str, List[str]],
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Job:
+        job = Job(f"j{next(self.counter)}", parse_command(command), resolve_cwd(cwd))
+        job.env = build_env(env)
+        return job
+
+    async def execute(self, job: Job, timeout: float) -> None:
+        async with self.pool():
+            job.status = "running"
+            try:
+                job.process = await asyncio.create_subprocess_exec(
+                    *job.argv,
+                    cwd=job.cwd,
+                    env=job.env,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    # Own process group, killed as a whole on timeout
+                    start_new_session=True,
+                )
+            except OSError as e:
+                job.output.write(f"Error starting command: {e}\n".encode())
+                job.status, job.returncode = "finished", 127
+                return
+            apply_limits(job.process.pid)
+
+            async def pump() -> None:
+                while chunk := await job.process.stdout.read(65536):
+                    job.output.write(chunk)
+
+            try:
+                await asyncio.wait_for(pump(), timeout)
+                job.returncode = await job.process.wait()
+                job.status = "finished"
+            except asyncio.TimeoutError:
+                self.kill(job)
+                job.returncode = await job.process.wait()
+                job.status = "timed out"
+            except asyncio.CancelledError:
+                self.kill(job)
+                await job.process.wait()
+                job.returncode = job.process.returncode
+                job.status = "stopped"
+                raise
+
+    def kill(self, job: Job) -> None:
+        if job.process and job.process.returncode is None:
+            try:
+                os.killpg(job.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    async def run(
+        self,
+        command: Union[str, List[str]],
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: float = 60,
+    ) -> Job:
+        """Run a command to completion (or timeout) and return its job."""
+        job = self.create_job(command, cwd, env)
+        await self.execute(job, timeout)
+        return job
+
+    def start(
+        self,
+        command: Union[str, List[str]],
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: float = 600,
+    ) -> Job:
+        """Start a command in the background; poll it with `get`."""
+        self.forget_finished()
+        job = self.create_job(command, cwd, env)
+        job.task = asyncio.create_task(self.execute(job, timeout))
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def stop(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job and job.task and not job.task.done():
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+            # Cancelled while still queued on the pool
+            if job.status == "queued":
+                job.status = "stopped"
+        return job
+
+    def forget_finished(self) -> None:
+        """Keep only the most recent finished jobs around for polling."""
+        finished = [j for j in self.jobs.values() if j.task and j.task.done()]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.job_id]
+
+
+# Shared by every call of the server process
+RUNNER = Runner()
@@ -0,0 +1,357 @@
+import os
+import re
+import fnmatch
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterator, List, Sequence, Set, Tuple
+
+# Directories that are never worth searching, even without a .gitignore
+ALWAYS_SKIPPED_DIRS = {
+    ".git",
+    "__pycache__",
+    ".venv",
+    "venv",
+    "node_modules",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    # Private per-session overlays of an output dir, see clients/workspace.py
+    ".sessions",
+}
+
+BINARY_SNIFF_BYTES = 8192
+# Budget of the search index, least recently used entries are evicted first
+MAX_INDEX_BYTES = 32 * 1024 * 1024
+# Approximate size of an entry beyond its arrays: objects, path key and dict slot
+ENTRY_OVERHEAD_BYTES = 400
+
+
+class IgnoreRules:
+    """Subset of .gitignore semantics: globs, directory-only and anchored patterns, negation."""
+
+    def __init__(self, base: str, lines: List[str]) -> None:
+        self.base = base
+        self.rules: List[Tuple[str, bool, bool, bool]] = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A leading or middle slash anchors the pattern, checked before stripping it
+            anchored = "/" in line
+            self.rules.append((line.lstrip("/"), negated, dir_only, anchored))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["IgnoreRules"]:
+        path = os.path.join(directory, ".gitignore")
+        try:
+            with open(path, "r", errors="replace") as f:
+                return cls(directory, f.read().splitlines())
+        except OSError:
+            return None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if ignored, False if re-included, None if no rule applies."""
+        rel = os.path.relpath(path, self.base).replace(os.sep, "/")
+        name = rel.rsplit("/", 1)[-1]
+        result = None
+        for pattern, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = rel if anchored else name
+            if fnmatch.fnmatchcase(target, pattern) or (
+                anchored and fnmatch.fnmatchcase(target, pattern + "/*")
+            ):
+                result = not negated
+        return result
+
+
+def is_ignored(path: str, is_dir: bool, rules: List[IgnoreRules]) -> bool:
+    """Apply the .gitignore files from the root down; the deepest matching rule wins."""
+    ignored = False
+    for rule_set in rules:
+        matched = rule_set.match(path, is_dir)
+        if matched is not None:
+            ignored = matched
+    return ignored
+
+
+def glob_variants(glob: str) -> List[str]:
+    """Expand every "**/" of a glob to zero or more directories.
+
+    fnmatch's "*" also matches "/", so "**/" is either dropped or replaced with "*/".
+    """
+    variants = [""]
+    for i, piece in enumerate(glob.split("**/")):
+        if i:
+            variants = [v + sep for v in variants for sep in ("", "*/")]
+        variants = [v + piece for v in variants]
+    return list(dict.fromkeys(variants))
+
+
+def walk_files(
+    root: str, glob: str = "*", respect_gitignore: bool = True
+) -> Iterator[str]:
+    """Yield files under root matching the glob, pruning ignored directories early.
+
+    Globs without a slash match the file name, globs with a slash (e.g. "src/**/*.py")
+    match the path relative to root.
+    """
+    root = os.path.abspath(root)
+    glob_on_path = "/" in glob
+    globs = glob_variants(glob)
+    stack: List[Tuple[str, List[IgnoreRules]]] = [(root, [])]
+    while stack:
+        directory, rules = stack.pop()
+        if respect_gitignore:
+            local_rules = IgnoreRules.load(directory)
+            if local_rules:
+                rules = rules + [local_rules]
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name in ALWAYS_SKIPPED_DIRS:
+                    continue
+                if respect_gitignore and is_ignored(entry.path, True, rules):
+                    continue
+                subdirs.append(entry.path)
+            elif entry.is_file():
+                if respect_gitignore and is_ignored(entry.path, False, rules):
+                    continue
+                target = (
+                    os.path.relpath(entry.path, root).replace(os.sep, "/")
+                    if glob_on_path
+                    else entry.name
+                )
+                if any(fnmatch.fnmatch(target, g) for g in globs):
+                    yield entry.path
+        # Reverse so directories are visited in alphabetical order
+        for subdir in sorted(subdirs, reverse=True):
+            stack.append((subdir, rules))
+
+
+def line_offsets(text: str) -> "array[int]":
+    """Return the start offset of every line in the text."""
+    offsets = array("q", [0])
+    position = text.find("\n")
+    while position != -1:
+        offsets.append(position + 1)
+        position = text.find("\n", position + 1)
+    return offsets
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def trigram_hashes(grams: Set[str]) -> "array[int]":
+    """Sorted 32-bit hashes of trigrams, 4 bytes each instead of a str in a set.
+
+    A collision can only keep a file that does not contain the literal, never rule
+    out one that does.
+    """
+    return array("I", sorted({hash(gram) & 0xFFFFFFFF for gram in grams}))
+
+
+def contains_all(hashes: "array[int]", wanted: Sequence[int]) -> bool:
+    for value in wanted:
+        i = bisect_left(hashes, value)
+        if i == len(hashes) or hashes[i] != value:
+            return False
+    return True
+
+
+def literal_of(pattern: str) -> Optional[str]:
+    """Return the pattern as a literal string if it has no regex syntax."""
+    if re.search(r"[\\.^$*+?{}\[\]|()]", pattern):
+        return None
+    return pattern
+
+
+class IndexEntry:
+    __slots__ = ("mtime_ns", "size", "offsets", "trigrams")
+
+    def __init__(
+        self, mtime_ns: int, size: int, offsets: "array[int]", grams: "array[int]"
+    ):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.offsets = offsets
+        self.trigrams = grams
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            ENTRY_OVERHEAD_BYTES
+            + len(self.offsets) * self.offsets.itemsize
+            + len(self.trigrams) * self.trigrams.itemsize
+        )
+
+
+class SearchIndex:
+    """Incremental per-file index: (path, mtime, size) -> line offsets and trigrams.
+
+    Trigrams are computed on lowercased text so the same entry can rule files out for
+    both case-sensitive and case-insensitive literal queries. Entries are rebuilt
+    lazily when a file's mtime or size changes, and the least recently used ones
+    (including those of deleted files) are evicted beyond `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = MAX_INDEX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, IndexEntry]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[IndexEntry]:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return None
+            if entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.entries.move_to_end(path)
+                return entry
+        return None
+
+    def update(self, path: str, stat: os.stat_result, text: str) -> IndexEntry:
+        entry = IndexEntry(
+            stat.st_mtime_ns,
+            stat.st_size,
+            line_offsets(text),
+            trigram_hashes(trigrams(text.lower())),
+        )
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old:
+                self.size -= old.nbytes
+            self.entries[path] = entry
+            self.size += entry.nbytes
+            while self.size > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.nbytes
+        return entry
+
+
+# Shared by every call of the server process
+INDEX = SearchIndex()
+
+
+def search_file(
+    path: str,
+    regex: "re.Pattern[str]",
+    literal_grams: Optional[Sequence[int]],
+    max_file_size: int,
+    max_matches: int,
+    index: Optional[SearchIndex],
+) -> List[Tuple[str, int, str]]:
+    """Search one file, returning (path, line number, line) matches."""
+    try:
+        stat = os.stat(path)
+        if stat.st_size > max_file_size:
+            return []
+        entry = index.get(path, stat) if index else None
+        if (
+            entry is not None
+            and literal_grams
+            and not contains_all(entry.trigrams, literal_grams)
+        ):
+            return []
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return []
+    text = data.decode("utf-8", errors="replace")
+    if index is not None:
+        entry = entry or index.update(path, stat, text)
+        offsets = entry.offsets
+    else:
+        offsets = None
+
+    matches = []
+    last_line = -1
+    for match in regex.finditer(text):
+        if offsets is None:
+            offsets = line_offsets(text)
+        line_index = bisect_right(offsets, match.start()) - 1
+        if line_index == last_line:
+            continue
+        last_line = line_index
+        end = (
+            offsets[line_index + 1] - 1 if line_index + 1 < len(offsets) else len(text)
+        )
+        matches.append(
+            (path, line_index + 1, text[offsets[line_index] : end].rstrip("\r"))
+        )
+        if len(matches) >= max_matches:
+            break
+    return matches
+
+
+def search(
+    root: str,
+    pattern: Optional[str] = None,
+    glob: str = "*",
+    case_sensitive: bool = True,
+    max_results: int = 200,
+    max_file_size: int = 1_000_000,
+    respect_gitignore: bool = True,
+    use_index: bool = False,
+    max_workers: Optional[int] = None,
+) -> Tuple[List[Tuple[str, int, str]], bool]:
+    """Find files matching a glob and, optionally, lines matching a regex.
+
+    Returns:
+        (matches, truncated). Without a pattern, matches are (path, 0, "") tuples.
+    """
+    files = walk_files(root, glob, respect_gitignore)
+    if pattern is None:
+        paths = []
+        for path in files:
+            if len(paths) >= max_results:
+                return [(p, 0, "") for p in paths], True
+            paths.append(path)
+        return [(p, 0, "") for p in paths], False
+
+    regex = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+    literal = literal_of(pattern)
+    literal_grams = (
+        trigram_hashes(trigrams(literal.lower()))
+        if literal and len(literal) >= 3
+        else None
+    )
+    index = INDEX if use_index else None
+
+    matches: List[Tuple[str, int, str]] = []
+    with ThreadPoolExecutor(
+        max_workers=max_workers or min(32, (os.cpu_count() or 1) + 4)
+    ) as pool:
+        results = pool.map(
+            lambda path: search_file(
+                path, regex, literal_grams, max_file_size, max_results, index
+            ),
+            files,
+        )
+        for file_matches in results:
+            matches.extend(file_matches)
+            if len(matches) >= max_results:
+                # Drop the queued files; already running searches finish on their own
+                pool.shutdown(wait=False, cancel_futures=True)
+                return matches[:max_results], True
+    return matches, False
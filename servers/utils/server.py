@@ -1,9 +1,20 @@
 from mcp.server.fastmcp import FastMCP
 import os
+import asyncio
 import requests
 
+import file_cache
+
+import search as file_search
+import snapshot as tree_snapshot
+import runner
+import storage
+
 mcp = FastMCP("utils")
 
+# Reuses connections (TCP, TLS) between requests to the same host
+session = requests.Session()
+
 
 @mcp.tool()
 def read_file(file_path: str) -> str:
@@ -17,16 +28,15 @@ def read_file(file_path: str) -> str:
         The contents of the file as a string.
     """
     try:
-        with open(file_path, "r") as f:
-            return f.read()
+        return file_cache.CACHE.read(file_path)
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
 
 @mcp.tool()
-def write_file(file_path: str, content: str, append: bool = False) -> str:
+async def write_file(file_path: str, content: str, append: bool = False) -> str:
     """
-    Write content to a file.
+    Write content to a file. The file is replaced atomically, so concurrent readers never see a partial write.
 
     Args:
         file_path: Path to the file to write to.
@@ -36,16 +46,171 @@ def write_file(file_path: str, content: str, append: bool = False) -> str:
     Returns:
         Success message or error message.
     """
-    mode = "a" if append else "w"
     try:
-        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
-        with open(file_path, mode) as f:
-            f.write(content)
+        # Serializes writers of the same path, including other agent sessions. In a
+        # worker thread, waiting for the lock of a busy path must not stall the loop.
+        await asyncio.to_thread(storage.locked_write, file_path, content, append)
+        file_cache.CACHE.invalidate(file_path)
         return f"Successfully wrote to {file_path}"
     except Exception as e:
         return f"Error writing to file: {str(e)}"
 
 
+@mcp.tool()
+async def prefetch_files(file_paths: list, max_bytes: int = 512 * 1024) -> str:
+    """
+    Warm the read cache with files that are likely to be read soon. Used by the client between model turns.
+
+    Args:
+        file_paths: Paths of the files to load, in priority order.
+        max_bytes: Stop once this many bytes were loaded.
+
+    Returns:
+        Number of files and bytes loaded.
+    """
+    loaded = 0
+    warmed = 0
+    for file_path in file_paths:
+        try:
+            size = os.path.getsize(file_path)
+            if loaded + size > max_bytes:
+                continue
+            if file_cache.CACHE.get(file_path) is None:
+                await asyncio.to_thread(file_cache.CACHE.read, file_path)
+                warmed += 1
+            loaded += size
+        except Exception:
+            # Predictions can be wrong: missing or unreadable files are skipped
+            continue
+    return f"Prefetched {warmed} files ({loaded} bytes in cache)"
+
+
+@mcp.tool()
+async def search_files(
+    root: str,
+    pattern: str = None,
+    glob: str = "*",
+    case_sensitive: bool = True,
+    max_results: int = 200,
+    max_file_size: int = 1_000_000,
+    respect_gitignore: bool = True,
+    use_index: bool = True,
+) -> str:
+    """
+    Search a directory tree for files by glob and, optionally, for lines matching a regex.
+    Prefer this over reading files one by one to find where something is defined.
+
+    Args:
+        root: Directory to search.
+        pattern: Optional regular expression to search for in file contents. If omitted, only matching file paths are returned.
+        glob: Glob filtering files, on the file name (e.g. "*.py") or, if it contains a slash, on the path relative to root (e.g. "src/**/*.py").
+        case_sensitive: Whether the pattern is case sensitive.
+        max_results: Maximum number of matches to return.
+        max_file_size: Files larger than this many bytes are skipped. Binary files are always skipped.
+        respect_gitignore: Skip files and directories ignored by .gitignore files.
+        use_index: Reuse the server's incremental index to skip unchanged files that cannot match.
+
+    Returns:
+        One "path:line: text" entry per match (or one path per file without a pattern), or an error message.
+    """
+    try:
+        if not os.path.isdir(root):
+            return f"Error searching files: {root} is not a directory"
+        # Off the event loop: a full-tree search must not stall concurrent calls
+        matches, truncated = await asyncio.to_thread(
+            file_search.search,
+            root,
+            pattern=pattern,
+            glob=glob,
+            case_sensitive=case_sensitive,
+            max_results=max_results,
+            max_file_size=max_file_size,
+            respect_gitignore=respect_gitignore,
+            use_index=use_index,
+        )
+        if pattern is None:
+            lines = [path for path, _, _ in matches]
+        else:
+            lines = [f"{path}:{line}: {text}" for path, line, text in matches]
+        if not lines:
+            return "No matches found"
+        if truncated:
+            lines.append(f"... results truncated at {max_results} matches")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Error searching files: {str(e)}"
+
+
+@mcp.tool()
+async def list_tree(
+    root: str,
+    since_snapshot: str = None,
+    hashes: bool = False,
+    max_entries: int = 500,
+    respect_gitignore: bool = True,
+) -> str:
+    """
+    List the files under a directory as a compact snapshot, or only what changed since a previous snapshot.
+    Call it without since_snapshot once to get a snapshot id, then pass that id to get only the changes.
+
+    Args:
+        root: Directory to list.
+        since_snapshot: Optional snapshot id returned by a previous call on the same root.
+        hashes: Include a short content hash per file and use it to detect modifications.
+        max_entries: Maximum number of file entries to return.
+        respect_gitignore: Skip files and directories ignored by .gitignore files.
+
+    Returns:
+        A header with the new snapshot id followed by one "path size mtime [hash]" line per file,
+        or "+ added", "~ modified" and "- deleted" lines when since_snapshot is given.
+    """
+    try:
+        if not os.path.isdir(root):
+            return f"Error listing tree: {root} is not a directory"
+        previous = tree_snapshot.STORE.get(since_snapshot) if since_snapshot else None
+        if previous and previous.root != os.path.abspath(root):
+            return f"Error listing tree: snapshot {since_snapshot} was taken for {previous.root}"
+        # Off the event loop: walking and hashing a large tree must not stall concurrent calls
+        current = await asyncio.to_thread(
+            tree_snapshot.STORE.take,
+            root,
+            hashes=hashes,
+            respect_gitignore=respect_gitignore,
+            previous=previous,
+        )
+
+        total_size = sum(state.size for state in current.files.values())
+        header = f"snapshot {current.snapshot_id}: {len(current.files)} files, {tree_snapshot.format_size(total_size)}"
+        if previous:
+            added, modified, deleted = tree_snapshot.diff(previous, current)
+            header += f" (since {previous.snapshot_id}: {len(added)} added, {len(modified)} modified, {len(deleted)} deleted)"
+            lines = (
+                ["+ " + tree_snapshot.format_entry(p, current.files[p]) for p in added]
+                + [
+                    "~ " + tree_snapshot.format_entry(p, current.files[p])
+                    for p in modified
+                ]
+                + ["- " + p for p in deleted]
+            )
+        else:
+            if since_snapshot:
+                header += (
+                    f" (snapshot {since_snapshot} unknown or expired, full listing)"
+                )
+            lines = [
+                tree_snapshot.format_entry(path, state)
+                for path, state in sorted(current.files.items())
+            ]
+
+        if len(lines) > max_entries:
+            lines = lines[:max_entries] + [
+                f"... {len(lines) - max_entries} more entries"
+            ]
+        return "\n".join([header] + lines)
+    except Exception as e:
+        return f"Error listing tree: {str(e)}"
+
+
 # @mcp.tool()
 # def create_venv(venv_path: str = ".venv") -> str:
 #     """
@@ -142,7 +307,7 @@ def make_request(
         Response content or error message.
     """
     try:
-        response = requests.request(
+        response = session.request(
             method=method,
             url=url,
             params=params,
@@ -161,46 +326,96 @@ def make_request(
         return f"Error making request: {str(e)}"
 
 
-# @mcp.tool()
-# def run_command(
-#     command: str, cwd: str = None, env: dict = None, capture_output: bool = True
-# ) -> str:
-#     """
-#     Run a shell command.
+async def run_command(
+    command: str, cwd: str = None, env: dict = None, timeout: int = 60
+) -> str:
+    """
+    Run a command and wait for it to finish. Use it to run tests, linters or scripts on generated code.
+    The command is not run through a shell: pipes, redirections and globs are not supported.
+    It runs with the server's permissions, only its starting directory is restricted.
 
-#     Args:
-#         command: Command to run.
-#         cwd: Current working directory for the command.
-#         env: Environment variables for the command.
-#         capture_output: Whether to capture and return command output.
+    Args:
+        command: Command to run, e.g. "python -m pytest -q".
+        cwd: Working directory, relative to the workspace root. Must stay inside it.
+        env: Optional extra environment variables for the command.
+        timeout: Seconds before the command is killed.
 
-#     Returns:
-#         Command output or error message.
-#     """
-#     try:
-#         # Prepare environment variables
-#         environment = os.environ.copy()
-#         if env:
-#             environment.update(env)
-
-#         if capture_output:
-#             result = subprocess.run(
-#                 command,
-#                 shell=True,
-#                 cwd=cwd,
-#                 env=environment,
-#                 capture_output=True,
-#                 text=True,
-#             )
-#             if result.returncode != 0:
-#                 return f"Command failed with exit code {result.returncode}.\nOutput: {result.stdout}\nError: {result.stderr}"
-#             return result.stdout
-#         else:
-#             # Run without capturing output (output goes directly to terminal)
-#             subprocess.run(command, shell=True, cwd=cwd, env=environment)
-#             return "Command executed (output not captured)"
-#     except Exception as e:
-#         return f"Error executing command: {str(e)}"
+    Returns:
+        Exit status followed by the combined stdout and stderr (long output keeps its beginning and end), or an error message.
+    """
+    try:
+        job = await runner.RUNNER.run(command, cwd=cwd, env=env, timeout=timeout)
+        if job.status == "timed out":
+            status = f"Command timed out after {timeout}s"
+        else:
+            status = f"Command exited with code {job.returncode}"
+        return f"{status}\n{job.output.read()}"
+    except Exception as e:
+        return f"Error executing command: {str(e)}"
+
+
+async def start_command(
+    command: str, cwd: str = None, env: dict = None, timeout: int = 600
+) -> str:
+    """
+    Start a long running command (e.g. a dev server or a slow test suite) in the background.
+    Use poll_command to read its output and stop_command to stop it.
+
+    Args:
+        command: Command to run. It is not run through a shell.
+        cwd: Working directory, relative to the workspace root. Must stay inside it.
+        env: Optional extra environment variables for the command.
+        timeout: Seconds before the command is killed.
+
+    Returns:
+        The job id, or an error message.
+    """
+    try:
+        job = runner.RUNNER.start(command, cwd=cwd, env=env, timeout=timeout)
+        return f"Started job {job.job_id}"
+    except Exception as e:
+        return f"Error starting command: {str(e)}"
+
+
+async def poll_command(job_id: str, offset: int = 0) -> str:
+    """
+    Read the status and new output of a background command.
+
+    Args:
+        job_id: Id returned by start_command.
+        offset: Output offset returned by the previous poll, to only get new output.
+
+    Returns:
+        Job status, the next offset to poll from, and the output since offset.
+    """
+    job = runner.RUNNER.get(job_id)
+    if job is None:
+        return f"Error: unknown job {job_id}"
+    return (
+        f"{job.describe()}, next offset {job.output.total}\n{job.output.read(offset)}"
+    )
+
+
+async def stop_command(job_id: str) -> str:
+    """
+    Stop a background command.
+
+    Args:
+        job_id: Id returned by start_command.
+
+    Returns:
+        Final job status and the tail of its output.
+    """
+    job = await runner.RUNNER.stop(job_id)
+    if job is None:
+        return f"Error: unknown job {job_id}"
+    return f"{job.describe()}\n{job.output.read()}"
+
+
+# Commands run with the server's permissions, only expose them when opted in
+if runner.ENABLED:
+    for command_tool in (run_command, start_command, poll_command, stop_command):
+        mcp.tool()(command_tool)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+import os
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple
+
+from search import walk_files
+
+# Number of snapshots kept per server process, oldest are evicted first
+MAX_SNAPSHOTS = 64
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class FileState:
+    __slots__ = ("size", "mtime_ns", "digest")
+
+    def __init__(self, size: int, mtime_ns: int, digest: Optional[str] = None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+
+    def same_as(self, other: "FileState") -> bool:
+        if self.digest and other.digest:
+            return self.digest == other.digest
+        return self.size == other.size and self.mtime_ns == other.mtime_ns
+
+
+class Snapshot:
+    def __init__(self, snapshot_id: str, root: str, files: Dict[str, FileState]):
+        self.snapshot_id = snapshot_id
+        self.root = root
+        self.files = files
+
+
+def file_digest(path: str) -> str:
+    """Short content hash, enough to tell edits apart in a listing."""
+    digest = hashlib.blake2b(digest_size=6)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SnapshotStore:
+    """Keeps recent tree snapshots so later listings can be sent as diffs."""
+
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS) -> None:
+        self.snapshots: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self.max_snapshots = max_snapshots
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def get(self, snapshot_id: str) -> Optional[Snapshot]:
+        with self.lock:
+            return self.snapshots.get(snapshot_id)
+
+    def take(
+        self,
+        root: str,
+        hashes: bool = False,
+        respect_gitignore: bool = True,
+        previous: Optional[Snapshot] = None,
+    ) -> Snapshot:
+        """Record the current state of the tree under root.
+
+        Hashes of files whose size and mtime did not change since `previous` are
+        reused instead of re-reading the file.
+        """
+        root = os.path.abspath(root)
+        files: Dict[str, FileState] = {}
+        for path in walk_files(root, "*", respect_gitignore):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            state = FileState(stat.st_size, stat.st_mtime_ns)
+            if hashes:
+                old = previous.files.get(rel) if previous else None
+                unchanged = (
+                    old is not None
+                    and old.size == state.size
+                    and old.mtime_ns == state.mtime_ns
+                )
+                if unchanged and old.digest:
+                    state.digest = old.digest
+                else:
+                    try:
+                        state.digest = file_digest(path)
+                    except OSError:
+                        continue
+            files[rel] = state
+
+        with self.lock:
+            snapshot = Snapshot(f"s{next(self.counter)}", root, files)
+            self.snapshots[snapshot.snapshot_id] = snapshot
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return snapshot
+
+
+def diff(old: Snapshot, new: Snapshot) -> Tuple[List[str], List[str], List[str]]:
+    """Return the (added, modified, deleted) relative paths between two snapshots."""
+    added = sorted(path for path in new.files if path not in old.files)
+    deleted = sorted(path for path in old.files if path not in new.files)
+    modified = sorted(
+        path
+        for path, state in new.files.items()
+        if path in old.files and not state.same_as(old.files[path])
+    )
+    return added, modified, deleted
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "K", "M"):
+        if size < 1024:
+            return f"{size}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}G"
+
+
+def format_entry(path: str, state: FileState) -> str:
+    # mtime in whole seconds is enough to order edits and keeps lines short
+    entry = f"{path} {format_size(state.size)} {state.mtime_ns // 1_000_000_000}"
+    return f"{entry} {state.digest}" if state.digest else entry
+
+
+# Shared by every call of the server process
+STORE = SnapshotStore()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+import locks
+
+# os.umask can only be read by changing it, which would race with file creations in
+# other threads, so it is read once at import time
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def atomic_write(path: str, content: str, append: bool = False) -> None:
+    """Replace a file in one step, readers see either the old or the new content.
+
+    The content is written to a temporary file in the same directory, flushed to
+    disk and renamed over the target. Appending rewrites the whole file.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    if append:
+        try:
+            with open(path, "r") as f:
+                content = f.read() + content
+        except FileNotFoundError:
+            pass
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def locked_write(path: str, content: str, append: bool = False) -> None:
+    """atomic_write under the lock of the path, serializing concurrent writers.
+
+    Raises:
+        TimeoutError: If another writer held the lock for too long.
+    """
+    with locks.path_lock(path):
+        atomic_write(path, content, append=append)
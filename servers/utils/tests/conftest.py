@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Server modules are imported as top-level modules, like server.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
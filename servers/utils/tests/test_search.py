@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import search
+
+
+def make_tree(root, paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("x\n")
+
+
+def walk(root, glob="*"):
+    return sorted(
+        os.path.relpath(path, root) for path in search.walk_files(str(root), glob)
+    )
+
+
+@pytest.mark.parametrize(
+    "glob, expected",
+    [
+        ("src/**/*.py", ["src/build/a.py", "src/c.py", "src/deep/er/d.py"]),
+        ("**/*.py", ["b.py", "src/build/a.py", "src/c.py", "src/deep/er/d.py"]),
+        ("src/**/er/*.py", ["src/deep/er/d.py"]),
+        ("*.py", ["b.py", "src/build/a.py", "src/c.py", "src/deep/er/d.py"]),
+    ],
+)
+def test_double_star_matches_zero_or_more_directories(tmp_path, glob, expected):
+    make_tree(tmp_path, ["b.py", "src/c.py", "src/build/a.py", "src/deep/er/d.py"])
+    assert walk(tmp_path, glob) == expected
+
+
+def test_leading_slash_anchors_gitignore_patterns(tmp_path):
+    make_tree(tmp_path, ["build/a.py", "src/build/b.py", "logs/c.py", "src/logs/d.py"])
+    (tmp_path / ".gitignore").write_text("/build/\nlogs/\n")
+    assert walk(tmp_path, "*.py") == ["src/build/b.py"]
+
+
+def test_index_evicts_least_recently_used_entries(tmp_path):
+    make_tree(tmp_path, [f"f{i}.txt" for i in range(4)])
+    paths = [str(tmp_path / f"f{i}.txt") for i in range(4)]
+    index = search.SearchIndex(max_bytes=3 * search.ENTRY_OVERHEAD_BYTES + 200)
+    for path in paths:
+        index.update(path, os.stat(path), "needle\n")
+    assert list(index.entries) == paths[1:]
+    assert index.get(paths[0], os.stat(paths[0])) is None
+    assert index.size <= index.max_bytes
+    entry = index.get(paths[1], os.stat(paths[1]))
+    assert search.contains_all(entry.trigrams, search.trigram_hashes({"nee", "dle"}))
+    assert not search.contains_all(entry.trigrams, search.trigram_hashes({"hay"}))
+
+
+def test_session_overlays_are_never_listed(tmp_path):
+    make_tree(tmp_path, ["app.py", ".sessions/other/x.py"])
+    assert walk(tmp_path, "*.py") == ["app.py"]